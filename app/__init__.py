@@ -3,11 +3,27 @@ __init__.py
 ====================================
 Defines the "app" Module and serves as an Entry Point to the Flask Application.
 Furthermore, the Swagger API Documentation gets set up as well as the API Routes.
+The Competency Extractors are created once per worker process and closed on shutdown. Importing the Module has no
+further side effects: creating the indexes and constraints of the Database and warming up the extractors happens in
+:func:`startup`.
 """
 
+import atexit
+import os
 from flask import Flask
 from flask_swagger_ui import get_swaggerui_blueprint
 from app.routes import routes
+from app.db import GraphDatabaseConnection, close_driver
+from app.jobs import JobManager
+from app.response_cache import ResponseCache
+from app.store import Store
+from app.preprocessing_utils import shutdown_preprocessing_pools
+from app.competency_extractor import (
+    CompetencyExtractorRegistry,
+    MLCompetencyExtractor,
+    PaperCompetencyExtractor,
+    TrieCompetencyExtractor,
+)
 
 app = Flask(__name__, static_folder="../docs", static_url_path="/docs")
 app.register_blueprint(routes)
@@ -21,3 +37,79 @@ swaggerui_blueprint = get_swaggerui_blueprint(
 )
 
 app.register_blueprint(swaggerui_blueprint)
+
+competency_extractors = CompetencyExtractorRegistry(
+    {
+        "paper": PaperCompetencyExtractor,
+        "ml": MLCompetencyExtractor,
+        "trie": TrieCompetencyExtractor,
+    }
+)
+app.extensions["competency_extractors"] = competency_extractors
+
+# created before the worker processes are forked, so that they share the data version of the cached responses
+response_cache = ResponseCache(
+    max_size=int(os.environ.get("RESPONSE_CACHE_SIZE", 128)),
+    max_bytes=int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 64 * 2**20)),
+)
+app.extensions["response_cache"] = response_cache
+
+
+def _init_job_process(shared_version) -> None:
+    # the Jobs run in separate processes, whose writes invalidate the responses cached by the worker processes
+    response_cache.share_version(shared_version)
+
+
+jobs = JobManager(
+    max_workers=int(os.environ.get("JOB_WORKERS", 2)),
+    initializer=_init_job_process,
+    initargs=(response_cache.shared_version,),
+)
+app.extensions["jobs"] = jobs
+
+# every write to the Database increments the data version, so the workers reload a label index that has been loaded
+# while the Store was being initialized
+Store.track_data_version(lambda: response_cache.version)
+
+# exit handlers run in reverse order, so the running jobs finish before the extractors, the preprocessing processes
+# and the shared Neo4J Driver are closed
+atexit.register(close_driver)
+atexit.register(shutdown_preprocessing_pools)
+atexit.register(competency_extractors.close)
+atexit.register(jobs.shutdown)
+
+
+def startup() -> None:
+    """
+    Prepares the server before it accepts requests: creates the indexes and constraints of the Database and warms up
+    the Competency Extractors listed in the environment variable "WARM_UP_EXTRACTORS" (comma separated, all of them
+    by default). Importing the "app" Module does neither, so it is called explicitly by gunicorn before the worker
+    processes are forked (see "gunicorn.conf.py") or by running ``flask --app app startup``.
+    Failures are logged, as the schema is also created when initializing the Store and each extractor is otherwise
+    loaded on first use.
+    """
+    try:
+        with GraphDatabaseConnection() as db:
+            db.create_schema()
+    except Exception as e:
+        # e.g. the Database is not reachable yet, the schema is then created when initializing the Store
+        app.logger.warning(f"Creating the Database schema failed: {e}")
+
+    warm_up_extractors = os.environ.get(
+        "WARM_UP_EXTRACTORS", ",".join(competency_extractors.extractor_classes)
+    )
+
+    for name in warm_up_extractors.split(","):
+        try:
+            competency_extractors.warm_up([name.strip()])
+        except Exception as e:
+            # e.g. the Database is not reachable yet, the extractor is then loaded on first use
+            app.logger.warning(
+                f"Warming up the Competency Extractor '{name}' failed: {e}"
+            )
+
+
+@app.cli.command("startup")
+def startup_command():
+    """Creates the Database schema and warms up the Competency Extractors."""
+    startup()
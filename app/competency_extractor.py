@@ -4,12 +4,19 @@ competency_extractor.py
 Defines the generic interface of a Competency Extractor and also contains different implementations of Competency Extractors.
 """
 
-from typing import List, Tuple
+from typing import Callable, Dict, Iterable, List, Tuple
 from app.models import Competency
+from app.model_manager import model_manager
 from app.store import Store, StoreLocal
 import pandas as pd
-import spacy
+import logging
 import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# components of the spaCy pipeline needed to recognize entities, all other components are disabled
+ML_PIPELINE_COMPONENTS = ("tok2vec", "transformer", "ner")
 
 
 class CompetencyExtractorInterface:
@@ -28,6 +35,14 @@ class CompetencyExtractorInterface:
         """
         pass
 
+    def warm_up(self) -> None:
+        """Loads everything that is otherwise loaded lazily on the first extraction."""
+        pass
+
+    def close(self) -> None:
+        """Releases the resources held by the Competency Extractor."""
+        pass
+
 
 class DummyCompetencyExtractor(CompetencyExtractorInterface):
     """A First Dummy Competency Extractor used only for testing and initial setup."""
@@ -69,6 +84,14 @@ class PaperCompetencyExtractor(CompetencyExtractorInterface):
         self.store = Store()
         self.preprocessor = self.store.preprocessor
 
+    def warm_up(self) -> None:
+        """Loads the tokenizer models and the label index of the Store."""
+        self.extract_competencies(["Musikpersonal verwalten"])
+
+    def close(self) -> None:
+        """Closes the Database Connection of the Store."""
+        self.store.close()
+
     def extract_competencies(
         self, course_descriptions: List[str]
     ) -> List[List[Competency]]:
@@ -145,6 +168,45 @@ class PaperCompetencyExtractor(CompetencyExtractorInterface):
         return ([], n)
 
 
+class TrieCompetencyExtractor(PaperCompetencyExtractor):
+    """
+    This Competency Extractor returns the same results as the :class:`PaperCompetencyExtractor`, but instead of the
+    recursive lookahead it matches phrases using a token-level trie over all labels
+    (see :class:`app.label_index.PhraseTrie`).
+
+    For every position of a tokenized text, the paper algorithm annotates the longest phrase starting at that position
+    which exactly matches a label. The lookahead only stops extending a phrase at a token that is not part of any
+    label, and such a token can never be part of a matching phrase either. Therefore, walking the trie from every
+    position and keeping the longest match yields exactly the phrases found by the paper algorithm, while the walk
+    is bounded by the length of the longest label instead of querying the Store for every prefix.
+
+    :ivar store: An Instance of a Store to check labels and sequences
+    :type store: Store
+    :ivar preprocessor: An instance of the :class:`app.preprocessing_utils.PreprocessorGerman` class to preprocess the labels of Competencies
+    :type preprocessor: PreprocessorGerman
+    """
+
+    def _get_competencies_from_tokenized_text(
+        self, tokenized_text: List[str]
+    ) -> List[Competency]:
+        """
+        Annotate a tokenized text by matching each position against the trie of all labels.
+        """
+        phrase_trie = self.store.label_index.phrase_trie
+        phrases = []
+
+        for start in range(len(tokenized_text)):
+            end = phrase_trie.longest_match(tokenized_text, start)
+            if end > start:
+                phrases.append(tokenized_text[start:end])
+
+        return [
+            competency
+            for competencies in self.store.check_sequences(phrases)
+            for competency in competencies
+        ]
+
+
 class PaperCompetencyExtractorLocal(PaperCompetencyExtractor):
     """
     This class contains the same functionality as the PaperCompetencyExtractor class. The only difference is that this
@@ -164,6 +226,22 @@ class PaperCompetencyExtractorLocal(PaperCompetencyExtractor):
         self.preprocessor = self.store.preprocessor
 
 
+class TrieCompetencyExtractorLocal(TrieCompetencyExtractor):
+    """
+    This class contains the same functionality as the TrieCompetencyExtractor class, but uses a local Store like the
+    :class:`PaperCompetencyExtractorLocal` class.
+
+    :ivar store: An Instance of a local Store to check labels and sequences
+    :type store: StoreLocal
+    :ivar preprocessor: An instance of the :class:`app.preprocessing_utils.PreprocessorGerman` class to preprocess the labels of Competencies
+    :type preprocessor: PreprocessorGerman
+    """
+
+    def __init__(self):
+        self.store = StoreLocal()
+        self.preprocessor = self.store.preprocessor
+
+
 class MLCompetencyExtractor(CompetencyExtractorInterface):
     """
     This Competency Extractor uses a Machine Learning Model that has been trained on a Dataset which was generated using
@@ -174,13 +252,29 @@ class MLCompetencyExtractor(CompetencyExtractorInterface):
     :ivar preprocessor: An instance of the :class:`app.preprocessing_utils.PreprocessorGerman` class to preprocess the labels of Competencies
     :type preprocessor: PreprocessorGerman
     :ivar nlp: An instance of a spaCy model, which is loaded from the location of the "MODEL_FILES" environment variable
+        and shared by all extractors of the process (see :mod:`app.model_manager`)
     :type nlp: spacy.Language
+
+    The Course Descriptions are processed in batches of "ML_BATCH_SIZE" texts (defaults to 64). If the environment
+    variable "ML_N_PROCESS" is set to more than 1, batches of more than one batch size are processed by that many
+    processes. spaCy forks these processes from the calling process, which is only safe from its main thread (a
+    forked process only keeps the calling thread, but inherits the locks held by all others). Called from any other
+    thread (e.g. a request handled by a threaded gunicorn worker), the batches are therefore processed by the calling
+    process itself. Background Jobs run in the main thread of their own processes (see :mod:`app.jobs`).
     """
 
     def __init__(self):
         self.store = Store()
         self.preprocessor = self.store.preprocessor
-        self.nlp = spacy.load(os.environ.get("MODEL_FILES"))
+        self.nlp = model_manager.get(os.environ.get("MODEL_FILES"))
+
+    def warm_up(self) -> None:
+        """Loads the tokenizer models and the label index of the Store and runs the model once."""
+        self.extract_competencies(["Musikpersonal verwalten"])
+
+    def close(self) -> None:
+        """Closes the Database Connection of the Store."""
+        self.store.close()
 
     def extract_competencies(
         self, course_descriptions: List[str]
@@ -199,24 +293,128 @@ class MLCompetencyExtractor(CompetencyExtractorInterface):
         texts = self.preprocessor.join_tokenized_texts(tokenized_texts)
         all_competencies = []
 
-        for text in texts:
-            doc = self.nlp(text)
-            entities = doc.ents
+        batch_size = int(os.environ.get("ML_BATCH_SIZE", 64))
+        # starting processes only pays off for large batches
+        n_process = (
+            int(os.environ.get("ML_N_PROCESS", 1))
+            if len(texts) > batch_size
+            else 1
+        )
+        if (
+            n_process > 1
+            and threading.current_thread() is not threading.main_thread()
+        ):
+            logger.warning(
+                "ML_N_PROCESS is ignored outside of the main thread, since forking from other threads is not safe"
+            )
+            n_process = 1
+
+        docs = self.nlp.pipe(
+            texts,
+            batch_size=batch_size,
+            n_process=n_process,
+            disable=[
+                name
+                for name in self.nlp.pipe_names
+                if name not in ML_PIPELINE_COMPONENTS
+            ],
+        )
+
+        entities_by_text = [
+            [entity.text for entity in doc.ents] for doc in docs
+        ]
 
-            course_competencies = []
-            for entity in entities:
-                competencies = self.store.check_sequence(
-                    entity.text.split(" ")
-                )
-                course_competencies += competencies
+        # resolve the distinct entities of all texts at once
+        entities = list(
+            dict.fromkeys(
+                entity
+                for text_entities in entities_by_text
+                for entity in text_entities
+            )
+        )
+        competencies_by_entity = dict(
+            zip(
+                entities,
+                self.store.check_sequences(
+                    [entity.split(" ") for entity in entities]
+                ),
+            )
+        )
 
-            all_competencies += [course_competencies]
+        for text_entities in entities_by_text:
+            all_competencies += [
+                [
+                    competency
+                    for entity in text_entities
+                    for competency in competencies_by_entity[entity]
+                ]
+            ]
 
         return all_competencies
 
 
 class MLCompetencyExtractorLocal(MLCompetencyExtractor):
     def __init__(self):
-        self.nlp = spacy.load(os.environ.get("MODEL_FILES"))
+        self.nlp = model_manager.get(os.environ.get("MODEL_FILES"))
         self.store = StoreLocal()
         self.preprocessor = self.store.preprocessor
+
+
+class CompetencyExtractorRegistry:
+    """
+    The CompetencyExtractorRegistry creates each Competency Extractor only once and shares the instance between
+    all requests (and threads) of a worker process, so that the Store, the Preprocessor and the models of an
+    extractor do not have to be loaded again for every request.
+
+    :param extractors: A mapping of extractor names to the classes (or factories) that create them
+    :type extractors: Dict[str, Callable[[], CompetencyExtractorInterface]]
+    """
+
+    def __init__(
+        self,
+        extractors: Dict[str, Callable[[], CompetencyExtractorInterface]],
+    ):
+        self.extractor_classes = extractors
+        self.extractors: Dict[str, CompetencyExtractorInterface] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CompetencyExtractorInterface:
+        """
+        Get the shared instance of a Competency Extractor, which is created on first use.
+
+        :param name: Name of the Competency Extractor (e.g. paper or ml)
+        :type name: str
+        :return: The shared Competency Extractor, or None if there is no extractor with that name
+        :rtype: CompetencyExtractorInterface
+        """
+        if name not in self.extractor_classes:
+            return None
+
+        extractor = self.extractors.get(name)
+        if extractor is None:
+            with self._lock:
+                extractor = self.extractors.get(name)
+                if extractor is None:
+                    extractor = self.extractor_classes[name]()
+                    self.extractors[name] = extractor
+
+        return extractor
+
+    def warm_up(self, names: Iterable[str]) -> None:
+        """
+        Create and warm up the given Competency Extractors.
+
+        :param names: Names of the Competency Extractors
+        :type names: Iterable[str]
+        """
+        for name in names:
+            extractor = self.get(name)
+            if extractor:
+                extractor.warm_up()
+
+    def close(self) -> None:
+        """Closes all Competency Extractors that have been created."""
+        with self._lock:
+            for extractor in self.extractors.values():
+                extractor.close()
+            self.extractors = {}
@@ -4,11 +4,13 @@ db.py
 Everything related to interacting with the Neo4J Graph Database.
 """
 
-from typing import List
-from neo4j import GraphDatabase
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from neo4j import READ_ACCESS, WRITE_ACCESS, Driver, GraphDatabase
 from neo4j.exceptions import ClientError
+import hashlib
 import os
-from app.models import Competency, Course
+import threading
+from app.models import COMPETENCY_FIELDS, COURSE_FIELDS, Competency, Course
 from app.preprocessing_utils import PreprocessorGerman
 
 
@@ -48,16 +50,301 @@ class RetrievingLabelFailed(Exception):
     pass
 
 
+class SchemaCreationFailed(Exception):
+    """Raised when indexes or constraints couldn't be created"""
+
+    pass
+
+
+# the fulltext index used to search Courses, which is created lazily if it is missing
+COURSE_FULLTEXT_INDEX = "course_description_fulltext"
+COURSE_FULLTEXT_INDEX_QUERY = (
+    f"CREATE FULLTEXT INDEX {COURSE_FULLTEXT_INDEX} IF NOT EXISTS FOR (cou:Course) ON EACH [cou.description] "
+    "OPTIONS {indexConfig: {`fulltext.analyzer`: 'german'}}"
+)
+
+# Indexes and constraints used by the queries of the GraphDatabaseConnection.
+# All of them are only created if they do not exist yet.
+SCHEMA_QUERIES = [
+    "CREATE CONSTRAINT competency_concept_uri IF NOT EXISTS FOR (com:Competency) REQUIRE com.conceptUri IS UNIQUE",
+    "CREATE INDEX label_text IF NOT EXISTS FOR (lab:Label) ON (lab.text)",
+    "CREATE TEXT INDEX label_text_contains IF NOT EXISTS FOR (lab:Label) ON (lab.text)",
+    # range indexes reject values larger than about 8 KB, so the unbounded descriptions are indexed by their hash
+    "CREATE INDEX course_description_hash_extractor IF NOT EXISTS FOR (cou:Course) ON (cou.descriptionHash, cou.extractor)",
+    COURSE_FULLTEXT_INDEX_QUERY,
+]
+
+# whether the fulltext index over the Course descriptions is online, which is only checked until it is
+_course_fulltext_index_online = False
+
+# characters with a special meaning in the Lucene query syntax used by the fulltext indexes
+LUCENE_SPECIAL_CHARACTERS = set('+-&|!(){}[]^"~*?:\\/')
+
+# Queries that should be answered using the indexes above, together with sample parameters to profile them.
+SCHEMA_HOT_QUERIES = {
+    "competency_by_sequence": (
+        "MATCH (lab:Label)<-[:IDENTIFIED_BY]-(com:Competency) where lab.text=$sequence RETURN com AS competency",
+        {"sequence": "musikpersonal verwalten"},
+    ),
+    "label_by_term": (
+        "MATCH (lab:Label) where lab.text CONTAINS $term RETURN lab AS label",
+        {"term": "verwalten"},
+    ),
+    "competency_by_uri": (
+        "MATCH (com:Competency) WHERE com.conceptUri=$uri RETURN com AS competency",
+        {"uri": ""},
+    ),
+    "course_by_description": (
+        "MATCH (cou:Course) where cou.descriptionHash = $descriptionHash AND cou.extractor = $extractor "
+        "AND cou.description = $description RETURN cou AS course",
+        {"descriptionHash": "", "description": "", "extractor": "paper"},
+    ),
+}
+
+
+def description_hash(description: str) -> str:
+    """Returns the hash of a Course description, which is stored as "descriptionHash" and indexed together with the
+    extractor to find existing Courses.
+
+    :param description: The description of the Course
+    :type description: str
+    :return: The SHA-256 hash of the description
+    :rtype: str
+    """
+    return hashlib.sha256(description.encode("utf-8")).hexdigest()
+
+
+def _projection(
+    variable: str, allowed_fields: Iterable[str], fields: List[str] = None
+) -> str:
+    """Returns a map projection of the selected fields (all by default) of the node bound to the variable.
+
+    :raises ValueError: if a field is not one of the allowed fields
+    """
+    if fields is None:
+        return f"{variable} {{.*}}"
+
+    for field in fields:
+        if field not in allowed_fields:
+            raise ValueError(f"Field '{field}' is not supported.")
+
+    return f"{variable} {{{', '.join(f'.{field}' for field in fields)}}}"
+
+
+def _paged_query(
+    match: str,
+    variable: str,
+    allowed_fields: Iterable[str],
+    fields: List[str] = None,
+    limit: int = None,
+) -> str:
+    """Completes a query matching the nodes bound to the variable, so that it returns the id and the properties of
+    the nodes with an id greater than the parameter "after_id", ordered by their id. Only the selected fields are
+    returned, and at most "limit" nodes if a limit is given.
+
+    :raises ValueError: if a field is not one of the allowed fields
+    """
+    query = (
+        f"{match} WITH DISTINCT {variable} WHERE id({variable}) > $after_id "
+        f"RETURN id({variable}) AS id, {_projection(variable, allowed_fields, fields)} AS properties ORDER BY id"
+    )
+    if limit is not None:
+        query += " LIMIT $limit"
+
+    return query
+
+
+def _fulltext_query(text: str) -> str:
+    """Converts a search text into a Lucene query matching all of its words. Characters with a special meaning in
+    the Lucene query syntax are escaped and the words are lowercased, so that they are not read as operators
+    (e.g. AND, OR, NOT)."""
+    terms = [
+        "".join(
+            f"\\{character}"
+            if character in LUCENE_SPECIAL_CHARACTERS
+            else character
+            for character in term.lower()
+        )
+        for term in text.split()
+    ]
+
+    return " AND ".join(terms)
+
+
+_driver: Driver = None
+_driver_pid: int = None
+_driver_lock = threading.Lock()
+
+
+def get_driver() -> Driver:
+    """Returns the Neo4J Driver shared by all Database Connections of this process. The Driver holds a pool of
+    connections, which can be configured using the following environment variables:
+
+    - "DB_MAX_CONNECTION_POOL_SIZE": maximum number of connections in the pool (defaults to 100)
+    - "DB_CONNECTION_ACQUISITION_TIMEOUT": seconds to wait for a free connection of the pool (defaults to 60)
+    - "DB_MAX_CONNECTION_LIFETIME": seconds after which a connection is closed instead of being returned to the
+      pool, regardless of whether it has been idle (defaults to 3600)
+
+    The connections are not checked for liveness before they are handed out (the Driver version used does not
+    support a liveness check), `keep_alive` only enables TCP keepalive on their sockets. A connection that has been
+    closed by the Database or a firewall before reaching its maximum lifetime therefore fails on its next use and
+    the transaction functions retry the transaction on another connection.
+
+    The Driver is created on first use and created again in processes that have been forked afterwards
+    (e.g. gunicorn workers), since its connections cannot be shared between processes.
+
+    :return: The shared Neo4J Driver
+    :rtype: neo4j.Driver
+    """
+    global _driver, _driver_pid
+
+    if _driver is None or _driver_pid != os.getpid():
+        with _driver_lock:
+            if _driver is None or _driver_pid != os.getpid():
+                _driver = GraphDatabase.driver(
+                    os.environ.get("DB_URI"),
+                    auth=("neo4j", "password"),
+                    max_connection_pool_size=int(
+                        os.environ.get("DB_MAX_CONNECTION_POOL_SIZE", 100)
+                    ),
+                    connection_acquisition_timeout=float(
+                        os.environ.get("DB_CONNECTION_ACQUISITION_TIMEOUT", 60)
+                    ),
+                    max_connection_lifetime=float(
+                        os.environ.get("DB_MAX_CONNECTION_LIFETIME", 3600)
+                    ),
+                    keep_alive=True,
+                )
+                _driver_pid = os.getpid()
+
+    return _driver
+
+
+def close_driver() -> None:
+    """Closes the Neo4J Driver shared by all Database Connections of this process, together with its connections."""
+    global _driver, _driver_pid
+
+    with _driver_lock:
+        if _driver is not None and _driver_pid == os.getpid():
+            _driver.close()
+        _driver = None
+        _driver_pid = None
+
+
 class GraphDatabaseConnection:
-    """This class handles all interactions with the Neo4J Graph Database"""
+    """This class handles all interactions with the Neo4J Graph Database.
+    All instances share the connection pool of one Driver per process (see :func:`get_driver`), so creating
+    a GraphDatabaseConnection is cheap. It can be used as a context manager:
+
+    .. code-block:: python
+
+        with GraphDatabaseConnection() as db:
+            courses = db.retrieve_all_courses()
+    """
+
+    @property
+    def driver(self) -> Driver:
+        """The Neo4J Driver shared by all Database Connections of this process"""
+        return get_driver()
 
-    def __init__(self):
-        db_uri = os.environ.get("DB_URI")
-        self.driver = GraphDatabase.driver(db_uri, auth=("neo4j", "password"))
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def close(self):
-        """Closes the Database Connection"""
-        self.driver.close()
+        """Closes the Database Connection. Every query returns its connection to the shared pool as soon as it is
+        done, so nothing is left to release here. Use :func:`close_driver` to close the pool itself."""
+        pass
+
+    def _read_transaction(self, transaction_function, *args):
+        """Runs the transaction function in a read transaction. Its session uses the READ access mode, so that
+        in a Neo4J cluster (using the "neo4j://" scheme in "DB_URI") the queries can be routed to any member
+        of the cluster instead of only to the leader."""
+        with self.driver.session(default_access_mode=READ_ACCESS) as session:
+            return session.read_transaction(transaction_function, *args)
+
+    def _write_transaction(self, transaction_function, *args):
+        """Runs the transaction function in a write transaction, using a session with the WRITE access mode."""
+        with self.driver.session(default_access_mode=WRITE_ACCESS) as session:
+            return session.write_transaction(transaction_function, *args)
+
+    def create_schema(self) -> None:
+        """Creates the indexes and constraints used by the queries (see SCHEMA_QUERIES), unless they already exist,
+        and waits until they are online. Courses inserted without a "descriptionHash" get their hash afterwards.
+
+        :raises SchemaCreationFailed: if creating an index or constraint failed
+        """
+        with self.driver.session(default_access_mode=WRITE_ACCESS) as session:
+            for query in SCHEMA_QUERIES + ["CALL db.awaitIndexes(300)"]:
+                try:
+                    session.run(query).consume()
+                except ClientError as e:
+                    raise SchemaCreationFailed(
+                        f"{query} raised an error: \n {e}"
+                    )
+
+        while self._write_transaction(self._set_description_hashes) > 0:
+            pass
+
+    @staticmethod
+    def _set_description_hashes(tx, batch_size: int = 1000) -> int:
+        """Sets the "descriptionHash" of Courses inserted before it was introduced, one batch at a time.
+        Returns the number of updated Courses."""
+        select_query = (
+            "MATCH (cou:Course) WHERE cou.descriptionHash IS NULL "
+            "RETURN id(cou) AS id, cou.description AS description LIMIT $limit"
+        )
+        update_query = (
+            "UNWIND $courses AS course MATCH (cou:Course) WHERE id(cou) = course.id "
+            "SET cou.descriptionHash = course.descriptionHash"
+        )
+
+        try:
+            courses = [
+                {
+                    "id": record["id"],
+                    "descriptionHash": description_hash(
+                        record["description"] or ""
+                    ),
+                }
+                for record in tx.run(select_query, limit=batch_size)
+            ]
+            tx.run(update_query, courses=courses).consume()
+        except ClientError as e:
+            raise SchemaCreationFailed(
+                f"{update_query} raised an error: \n {e}"
+            )
+
+        return len(courses)
+
+    def verify_schema(self) -> Dict[str, bool]:
+        """Profiles the queries that should be answered using the indexes (see SCHEMA_HOT_QUERIES) and checks
+        whether their execution plan contains an index operator (e.g. NodeIndexSeek) instead of a label scan.
+
+        :return: For each profiled query whether it uses an index
+        :rtype: Dict[str, bool]
+        """
+        uses_index = {}
+
+        with self.driver.session(default_access_mode=READ_ACCESS) as session:
+            for name, (query, parameters) in SCHEMA_HOT_QUERIES.items():
+                profile = session.run(f"PROFILE {query}", parameters).consume()
+                operators = self._get_plan_operators(profile.profile)
+                uses_index[name] = any(
+                    "Index" in operator for operator in operators
+                )
+
+        return uses_index
+
+    @staticmethod
+    def _get_plan_operators(plan: Dict) -> List[str]:
+        operators = [plan["operatorType"]]
+        for child in plan.get("children", []):
+            operators += GraphDatabaseConnection._get_plan_operators(child)
+
+        return operators
 
     def create_competency(self, competency: Competency) -> None:
         """Insert competeny with its properties and labels into the db
@@ -71,89 +358,107 @@ class GraphDatabaseConnection:
         if not self.retrieve_competency_by_uri(uri):
             self.create_competencies([competency])
 
-    def create_competencies(self, competencies: List[Competency]) -> None:
-        """Insert competencies with their properties and labels into the db
+    def create_competencies(
+        self,
+        competencies: List[Competency],
+        batch_size: int = None,
+        on_progress: Callable[[int, int], None] = None,
+    ) -> None:
+        """Insert competencies with their properties and labels into the db. The competencies are inserted in
+        batches, each batch using a single transaction with one query for all of its competencies and labels.
+        Batches that have been inserted successfully are kept if a later batch fails. Competencies are merged on
+        their concept URI, so inserting the same competencies again (e.g. after a failed batch) only inserts the
+        missing ones.
 
         :param competencies: Competencies with Properties and Labels
         :type competencies: List[Competency]
+        :param batch_size: Number of competencies per batch, defaults to the environment variable "IMPORT_BATCH_SIZE" or 1000
+        :type batch_size: int
+        :param on_progress: Called after each batch with the number of competencies inserted so far and the total number of competencies
+        :type on_progress: Callable[[int, int], None]
 
         :raises CompetencyInsertionFailed: if insertion into DB failed
         """
-        with self.driver.session() as session:
-            session.write_transaction(self._create_competencies, competencies)
+        if not batch_size:
+            batch_size = int(os.environ.get("IMPORT_BATCH_SIZE", 1000))
+
+        for start in range(0, len(competencies), batch_size):
+            batch = competencies[start : start + batch_size]
+            self._write_transaction(self._create_competencies, batch)
+
+            if on_progress:
+                on_progress(start + len(batch), len(competencies))
 
     @staticmethod
     def _create_competencies(tx, competencies: List[Competency]):
-        for competency in competencies:
-            create_competency_query = (
-                "CREATE (com:Competency {conceptType:$conceptType, conceptUri:$conceptUri, skillType:$skillType, "
-                "reuseLevel:$reuseLevel, preferredLabel:$preferredLabel, altLabels:$altLabels, hiddenLabels:$hiddenLabels, status:$status, "
-                "modifiedDate:$modifiedDate, scopeNote:$scopeNote, definition:$definition, inScheme:$inScheme, description:$description}) RETURN id(com) AS id"
-            )
-
-            try:
-                result = tx.run(
-                    create_competency_query,
-                    conceptType=competency.conceptType,
-                    conceptUri=competency.conceptUri,
-                    skillType=competency.skillType,
-                    reuseLevel=competency.reuseLevel,
-                    preferredLabel=competency.preferredLabel,
-                    altLabels=competency.altLabels,
-                    hiddenLabels=competency.hiddenLabels,
-                    status=competency.status,
-                    modifiedDate=competency.modifiedDate,
-                    scopeNote=competency.scopeNote,
-                    definition=competency.definition,
-                    inScheme=competency.inScheme,
-                    description=competency.description,
-                )
+        create_competencies_query = (
+            "UNWIND $competencies AS competency "
+            "MERGE (com:Competency {conceptUri: competency.properties.conceptUri}) "
+            "ON CREATE SET com = competency.properties "
+            # competencies of an earlier batch already have their labels
+            "WITH com, competency WHERE NOT EXISTS { (com)-[:IDENTIFIED_BY]->(:Label) } "
+            "UNWIND competency.labels AS label "
+            "CREATE (com)-[r:IDENTIFIED_BY]->(lab:Label {text:label.text, type:label.type})"
+        )
 
-                if not result:
-                    raise CompetencyInsertionFailed(
-                        "Inserting Competency did not return result."
-                    )
+        parameters = [
+            {
+                "properties": {
+                    "conceptType": competency.conceptType,
+                    "conceptUri": competency.conceptUri,
+                    "skillType": competency.skillType,
+                    "reuseLevel": competency.reuseLevel,
+                    "preferredLabel": competency.preferredLabel,
+                    "altLabels": competency.altLabels,
+                    "hiddenLabels": competency.hiddenLabels,
+                    "status": competency.status,
+                    "modifiedDate": competency.modifiedDate,
+                    "scopeNote": competency.scopeNote,
+                    "definition": competency.definition,
+                    "inScheme": competency.inScheme,
+                    "description": competency.description,
+                },
+                "labels": [
+                    {"text": label.text, "type": label.type}
+                    for label in competency.labels or []
+                ],
+            }
+            for competency in competencies
+        ]
 
-                result = result.single()
-                competencyId = result["id"]
-            except ClientError as e:
-                raise CompetencyInsertionFailed(
-                    f"{create_competency_query} raised an error: \n {e}"
-                )
+        try:
+            tx.run(
+                create_competencies_query, competencies=parameters
+            ).consume()
+        except ClientError as e:
+            raise CompetencyInsertionFailed(
+                f"{create_competencies_query} raised an error: \n {e}"
+            )
 
-            create_label_query = "CREATE (lab:Label {text:$text, type:$type}) RETURN id(lab) AS id"
-            create_relation_query = "MATCH (com:Competency) WHERE id(com)=$competencyId MATCH (lab:Label) WHERE id(lab)=$labelId CREATE (com)-[r:IDENTIFIED_BY]->(lab)"
+    def is_store_initialized(self) -> bool:
+        """Checks whether all competencies have been inserted by initializing the Store
+        (see :meth:`set_store_initialized`).
 
-            for label in competency.labels:
-                try:
-                    result = tx.run(
-                        create_label_query,
-                        text=label.text,
-                        type=label.type,
-                    )
+        :return: Whether the Store has been initialized completely
+        :rtype: bool
+        """
+        return self._read_transaction(self._is_store_initialized)
 
-                    if not result:
-                        raise CompetencyInsertionFailed(
-                            "Inserting Label did not return result."
-                        )
+    @staticmethod
+    def _is_store_initialized(tx) -> bool:
+        query = "MATCH (ini:Initialization {name: 'store'}) RETURN ini.completed AS completed"
+        record = tx.run(query).single()
+        return record is not None and bool(record["completed"])
 
-                    result = result.single()
-                    labelId = result["id"]
-                except ClientError as e:
-                    raise CompetencyInsertionFailed(
-                        f"{create_label_query} raised an error: \n {e}"
-                    )
+    def set_store_initialized(self) -> None:
+        """Marks the Store as initialized after its last batch of competencies has been inserted, so that
+        an initialization that failed halfway can be started again."""
+        self._write_transaction(self._set_store_initialized)
 
-                try:
-                    tx.run(
-                        create_relation_query,
-                        competencyId=competencyId,
-                        labelId=labelId,
-                    )
-                except ClientError as e:
-                    raise CompetencyInsertionFailed(
-                        f"{create_relation_query} raised an error: \n {e}"
-                    )
+    @staticmethod
+    def _set_store_initialized(tx) -> None:
+        query = "MERGE (ini:Initialization {name: 'store'}) SET ini.completed = true"
+        tx.run(query).consume()
 
     def create_course(
         self,
@@ -178,14 +483,13 @@ class GraphDatabaseConnection:
 
         associated_competencies_ids = list(set(associated_competencies_ids))
 
-        with self.driver.session() as session:
-            course = session.write_transaction(
-                self._create_course_transaction,
-                course_description,
-                extractor,
-                associated_competencies_ids,
-            )
-            return course
+        course = self._write_transaction(
+            self._create_course_transaction,
+            course_description,
+            extractor,
+            associated_competencies_ids,
+        )
+        return course
 
     @staticmethod
     def _create_course_transaction(
@@ -194,12 +498,16 @@ class GraphDatabaseConnection:
         extractor: str,
         associated_competencies_ids: List[Competency],
     ) -> Course:
-        select_course_query = "MATCH (cou:Course) where cou.description = $description AND cou.extractor = $extractor RETURN cou AS course"
+        select_course_query = (
+            "MATCH (cou:Course) where cou.descriptionHash = $descriptionHash AND cou.extractor = $extractor "
+            "AND cou.description = $description RETURN cou AS course"
+        )
         course_exists = False
 
         try:
             result = tx.run(
                 select_course_query,
+                descriptionHash=description_hash(course_description),
                 description=course_description,
                 extractor=extractor,
             )
@@ -216,11 +524,15 @@ class GraphDatabaseConnection:
                 f"Course with extractor '{extractor}' and description '{course_description}' already exists."
             )
 
-        create_course_query = "CREATE (c:Course) SET c.description = $description, c.extractor = $extractor RETURN id(c) AS id"
+        create_course_query = (
+            "CREATE (c:Course) SET c.description = $description, c.descriptionHash = $descriptionHash, "
+            "c.extractor = $extractor RETURN id(c) AS id"
+        )
         try:
             result = tx.run(
                 create_course_query,
                 description=course_description,
+                descriptionHash=description_hash(course_description),
                 extractor=extractor,
             )
             course_id = result.single()["id"]
@@ -247,52 +559,216 @@ class GraphDatabaseConnection:
             id=course_id, description=course_description, extractor=extractor
         )
 
-    def retrieve_all_courses(self) -> List[Course]:
-        """Queries all nodes from the DB with the label course
+    def create_courses(
+        self,
+        courses: List[Tuple[str, str, List[Competency]]],
+        batch_size: int = None,
+    ) -> Tuple[List[Course], List[int]]:
+        """Insert multiple Courses with their descriptions and associated competencies. The courses are inserted in
+        batches, each batch using a single transaction with one query per step for all of its courses.
+        Courses that already exist in the DB (or appear more than once in the given courses) are not inserted,
+        instead their positions are reported as conflicts.
+
+        :param courses: For each course its description, the extractor used (e.g. paper or ml) and its associated competencies
+        :type courses: List[Tuple[str, str, List[Competency]]]
+        :param batch_size: Number of courses per batch, defaults to the environment variable "IMPORT_BATCH_SIZE" or 1000
+        :type batch_size: int
+
+        :raises CourseInsertionFailed: if insertion into DB failed
+
+        :return: The inserted courses and the positions of the courses that already existed
+        :rtype: Tuple[List[Course], List[int]]
+        """
+        if not batch_size:
+            batch_size = int(os.environ.get("IMPORT_BATCH_SIZE", 1000))
+
+        created_courses = []
+        conflicts = []
+        seen_courses = set()
+
+        for start in range(0, len(courses), batch_size):
+            batch = []
+            for index, (
+                course_description,
+                extractor,
+                associated_competencies,
+            ) in enumerate(courses[start : start + batch_size], start=start):
+                if (course_description, extractor) in seen_courses:
+                    conflicts.append(index)
+                    continue
+
+                seen_courses.add((course_description, extractor))
+                batch.append(
+                    {
+                        "index": index,
+                        "description": course_description,
+                        "descriptionHash": description_hash(
+                            course_description
+                        ),
+                        "extractor": extractor,
+                        "competencyIds": list(
+                            set(
+                                competency.id
+                                for competency in associated_competencies
+                            )
+                        ),
+                    }
+                )
+
+            if len(batch) == 0:
+                continue
+
+            (batch_courses, batch_conflicts) = self._write_transaction(
+                self._create_courses_transaction, batch
+            )
+            created_courses += batch_courses
+            conflicts += batch_conflicts
+
+        return (created_courses, sorted(conflicts))
+
+    @staticmethod
+    def _create_courses_transaction(
+        tx, courses: List[Dict]
+    ) -> Tuple[List[Course], List[int]]:
+        select_courses_query = (
+            "UNWIND $courses AS course "
+            "MATCH (cou:Course) where cou.descriptionHash = course.descriptionHash AND cou.extractor = course.extractor "
+            "AND cou.description = course.description "
+            "RETURN DISTINCT course.index AS index"
+        )
+
+        try:
+            result = tx.run(select_courses_query, courses=courses)
+            conflicts = set(record["index"] for record in result)
+        except Exception as e:
+            raise CourseInsertionFailed(
+                f"{select_courses_query} raised an error: \n {e}"
+            )
+
+        new_courses = [
+            course for course in courses if course["index"] not in conflicts
+        ]
+
+        create_courses_query = (
+            "UNWIND $courses AS course "
+            "CREATE (c:Course) SET c.description = course.description, c.descriptionHash = course.descriptionHash, "
+            "c.extractor = course.extractor "
+            "RETURN course.index AS index, id(c) AS id"
+        )
+
+        try:
+            result = tx.run(create_courses_query, courses=new_courses)
+            course_ids = {record["index"]: record["id"] for record in result}
+        except ClientError as e:
+            raise CourseInsertionFailed(
+                f"{create_courses_query} raised an error: \n {e}"
+            )
+
+        create_relations_query = (
+            "UNWIND $relations AS relation "
+            "MATCH (cou:Course) WHERE id(cou)=relation.courseId MATCH (com:Competency) WHERE id(com)=relation.competencyId "
+            "CREATE (cou)-[r:MATCHES]->(com)"
+        )
+
+        relations = [
+            {
+                "courseId": course_ids[course["index"]],
+                "competencyId": competency_id,
+            }
+            for course in new_courses
+            for competency_id in course["competencyIds"]
+        ]
+
+        try:
+            tx.run(create_relations_query, relations=relations).consume()
+        except ClientError as e:
+            raise CompetencyInsertionFailed(
+                f"{create_relations_query} raised an error: \n {e}"
+            )
+
+        created_courses = [
+            Course(
+                id=course_ids[course["index"]],
+                description=course["description"],
+                extractor=course["extractor"],
+            )
+            for course in new_courses
+        ]
+
+        return (created_courses, list(conflicts))
+
+    def retrieve_all_courses(
+        self, after_id: int = -1, limit: int = None, fields: List[str] = None
+    ) -> List[Course]:
+        """Queries all nodes from the DB with the label course, ordered by their ID
+
+        :param after_id: only courses with a greater ID are returned
+        :type after_id: int
+        :param limit: maximum number of courses, all courses by default
+        :type limit: int
+        :param fields: fields of the courses to retrieve (see :data:`app.models.COURSE_FIELDS`), all by default
+        :type fields: List[str]
 
         :raises RetrievingCourseFailed: if retrieving courses failed
 
         :return: All courses
         :rtype: List[Course]
         """
-        with self.driver.session() as session:
-            course = session.write_transaction(self._retrieve_all_courses)
-            return course
+        course = self._read_transaction(
+            self._retrieve_all_courses, after_id, limit, fields
+        )
+        return course
 
     @staticmethod
-    def _retrieve_all_courses(tx) -> List[Course]:
-        query = "MATCH (c:Course) RETURN c AS course"
+    def _retrieve_all_courses(
+        tx, after_id: int, limit: int, fields: List[str]
+    ) -> List[Course]:
+        query = _paged_query(
+            "MATCH (cou:Course)", "cou", COURSE_FIELDS, fields, limit
+        )
         try:
-            result = tx.run(
-                query,
-            )
+            result = tx.run(query, after_id=after_id, limit=limit)
         except ClientError as e:
             raise RetrievingCourseFailed(f"{query} raised an error: \n {e}")
 
-        courses = [Course.fromDatabaseRecord(record) for record in result]
+        courses = [
+            Course.fromDatabaseProperties(record["id"], record["properties"])
+            for record in result
+        ]
         return courses
 
-    def retrieve_all_competencies(self) -> List[Competency]:
-        """Queries all nodes from the DB with the label competency
+    def retrieve_all_competencies(
+        self, after_id: int = -1, limit: int = None, fields: List[str] = None
+    ) -> List[Competency]:
+        """Queries all nodes from the DB with the label competency, ordered by their ID
+
+        :param after_id: only competencies with a greater ID are returned
+        :type after_id: int
+        :param limit: maximum number of competencies, all competencies by default
+        :type limit: int
+        :param fields: fields of the competencies to retrieve (see :data:`app.models.COMPETENCY_FIELDS`),
+            all by default
+        :type fields: List[str]
 
         :raises RetrievingCompetencyFailed: if retrieving competencies failed
 
         :return: all competencies
         :rtype: List[Competency]
         """
-        with self.driver.session() as session:
-            competencies = session.write_transaction(
-                self._retrieve_all_competencies
-            )
-            return competencies
+        competencies = self._read_transaction(
+            self._retrieve_all_competencies, after_id, limit, fields
+        )
+        return competencies
 
     @staticmethod
-    def _retrieve_all_competencies(tx) -> List[Competency]:
-        query = "MATCH (c:Competency) RETURN c AS competency"
+    def _retrieve_all_competencies(
+        tx, after_id: int, limit: int, fields: List[str]
+    ) -> List[Competency]:
+        query = _paged_query(
+            "MATCH (com:Competency)", "com", COMPETENCY_FIELDS, fields, limit
+        )
         try:
-            result = tx.run(
-                query,
-            )
+            result = tx.run(query, after_id=after_id, limit=limit)
         except ClientError as e:
             raise RetrievingCompetencyFailed(
                 f"{query} raised an error: \n {e}"
@@ -302,7 +778,10 @@ class GraphDatabaseConnection:
             return None
 
         competencies = [
-            Competency.fromDatabaseRecord(record) for record in result
+            Competency.fromDatabaseProperties(
+                record["id"], record["properties"]
+            )
+            for record in result
         ]
         return competencies
 
@@ -318,11 +797,8 @@ class GraphDatabaseConnection:
         :return: If the term exists in a label
         :rtype: bool
         """
-        with self.driver.session() as session:
-            is_found = session.write_transaction(
-                self._find_label_by_term, term
-            )
-            return is_found
+        is_found = self._read_transaction(self._find_label_by_term, term)
+        return is_found
 
     @staticmethod
     def _find_label_by_term(tx, term: str) -> bool:
@@ -352,11 +828,10 @@ class GraphDatabaseConnection:
         :return: Matching competencies
         :rtype: List[Competency]
         """
-        with self.driver.session() as session:
-            competencies = session.write_transaction(
-                self._find_competency_by_sequence, sequence
-            )
-            return competencies
+        competencies = self._read_transaction(
+            self._find_competency_by_sequence, sequence
+        )
+        return competencies
 
     @staticmethod
     def _find_competency_by_sequence(tx, sequence) -> List[Competency]:
@@ -377,78 +852,331 @@ class GraphDatabaseConnection:
                 f"{query} raised an error: \n {e}"
             )
 
+    def retrieve_competency_by_uri(self, uri: str) -> Competency:
+        """Find a competency by its concept URI.
+
+        :param uri: concept URI of the competency
+        :type uri: str
+
+        :raises RetrievingCompetencyFailed: if communication with the database goes wrong
+
+        :return: The matching competency, or None if there is no competency with that URI
+        :rtype: Competency
+        """
+        competency = self._read_transaction(
+            self._retrieve_competency_by_uri, uri
+        )
+        return competency
+
+    @staticmethod
+    def _retrieve_competency_by_uri(tx, uri: str) -> Competency:
+        query = "MATCH (com:Competency) WHERE com.conceptUri=$uri RETURN com AS competency"
+
+        try:
+            result = tx.run(query, uri=uri)
+
+            record = result.single()
+            if not record:
+                return None
+
+            return Competency.fromDatabaseRecord(record)
+        except Exception as e:
+            raise RetrievingCompetencyFailed(
+                f"{query} raised an error: \n {e}"
+            )
+
+    def retrieve_all_labels(self) -> List[Tuple[str, int]]:
+        """Queries the text of all labels together with the id of the competency they identify
+
+        :raises RetrievingLabelFailed: if communication with the database goes wrong
+
+        :return: Pairs of label text and competency id
+        :rtype: List[Tuple[str, int]]
+        """
+        labels = self._read_transaction(self._retrieve_all_labels)
+        return labels
+
+    @staticmethod
+    def _retrieve_all_labels(tx) -> List[Tuple[str, int]]:
+        query = "MATCH (lab:Label)<-[:IDENTIFIED_BY]-(com:Competency) RETURN lab.text AS text, id(com) AS competencyId"
+
+        try:
+            result = tx.run(query)
+
+            labels = [
+                (record["text"], record["competencyId"]) for record in result
+            ]
+            return labels
+        except Exception as e:
+            raise RetrievingLabelFailed(f"{query} raised an error: \n {e}")
+
+    def find_competencies_by_ids(
+        self, competency_ids: List[int]
+    ) -> List[Competency]:
+        """Find competencies by their IDs.
+
+        :param competency_ids: ids of the competencies
+        :type competency_ids: List[int]
+
+        :raises RetrievingCompetencyFailed: if communication with the database goes wrong
+
+        :return: Matching competencies
+        :rtype: List[Competency]
+        """
+        competencies = self._read_transaction(
+            self._find_competencies_by_ids, competency_ids
+        )
+        return competencies
+
+    @staticmethod
+    def _find_competencies_by_ids(
+        tx, competency_ids: List[int]
+    ) -> List[Competency]:
+        query = "MATCH (com:Competency) WHERE id(com) IN $ids RETURN com AS competency"
+
+        try:
+            result = tx.run(query, ids=competency_ids)
+
+            competencies = [
+                Competency.fromDatabaseRecord(record) for record in result
+            ]
+            return competencies
+        except Exception as e:
+            raise RetrievingCompetencyFailed(
+                f"{query} raised an error: \n {e}"
+            )
+
     @staticmethod
-    def _find_courses_by_competency(tx, competency_id: int) -> List[Course]:
-        query = "MATCH (com:Competency)<-[:MATCHES]-(cou:Course) WHERE id(com)=$id RETURN cou AS course"
+    def _find_courses_by_competency(
+        tx, competency_id: int, after_id: int, limit: int, fields: List[str]
+    ) -> List[Course]:
+        query = _paged_query(
+            "MATCH (com:Competency)<-[:MATCHES]-(cou:Course) WHERE id(com)=$id",
+            "cou",
+            COURSE_FIELDS,
+            fields,
+            limit,
+        )
 
         try:
-            result = tx.run(query, id=competency_id)
+            result = tx.run(
+                query, id=competency_id, after_id=after_id, limit=limit
+            )
 
             if not result:
                 return None
 
-            courses = [Course.fromDatabaseRecord(record) for record in result]
+            courses = [
+                Course.fromDatabaseProperties(
+                    record["id"], record["properties"]
+                )
+                for record in result
+            ]
             return courses
         except Exception as e:
             raise RetrievingCourseFailed(f"{query} raised an error: \n {e}")
 
-    def find_courses_by_competency(self, competency_id: int) -> List[Course]:
-        """Find courses by matching their competency provided by it's ID.
+    def find_courses_by_competency(
+        self,
+        competency_id: int,
+        after_id: int = -1,
+        limit: int = None,
+        fields: List[str] = None,
+    ) -> List[Course]:
+        """Find courses by matching their competency provided by it's ID. The courses are ordered by their ID.
 
         :param competency_id: id of the competency
         :type competency_id: int
+        :param after_id: only courses with a greater ID are returned
+        :type after_id: int
+        :param limit: maximum number of courses, all matching courses by default
+        :type limit: int
+        :param fields: fields of the courses to retrieve (see :data:`app.models.COURSE_FIELDS`), all by default
+        :type fields: List[str]
 
         :raises RetrievingCourseFailed: if communication with the database goes wrong
 
         :return: Matching courses
         :rtype: List[Course]
         """
-        with self.driver.session() as session:
-            courses = session.write_transaction(
-                self._find_courses_by_competency, competency_id
-            )
-            return courses
+        courses = self._read_transaction(
+            self._find_courses_by_competency,
+            competency_id,
+            after_id,
+            limit,
+            fields,
+        )
+        return courses
 
     @staticmethod
     def _find_courses_by_text_query(
-        tx, text_search_query: str
+        tx,
+        text_search_query: str,
+        offset: int,
+        limit: int,
+        fields: List[str],
     ) -> List[Course]:
-        query = "MATCH (cou:Course) where cou.description CONTAINS $text_search_query RETURN cou AS course"
+        lucene_query = _fulltext_query(text_search_query)
+        if not lucene_query:
+            return []
+
+        query = (
+            f"CALL db.index.fulltext.queryNodes('{COURSE_FULLTEXT_INDEX}', $lucene_query) "
+            "YIELD node AS cou, score "
+            f"RETURN id(cou) AS id, {_projection('cou', COURSE_FIELDS, fields)} AS properties "
+            "ORDER BY score DESC, id SKIP $offset"
+        )
+        if limit is not None:
+            query += " LIMIT $limit"
 
         try:
-            result = tx.run(query, text_search_query=text_search_query)
+            result = tx.run(
+                query,
+                lucene_query=lucene_query,
+                offset=offset,
+                limit=limit,
+            )
 
             if not result:
                 return None
 
-            courses = [Course.fromDatabaseRecord(record) for record in result]
+            courses = [
+                Course.fromDatabaseProperties(
+                    record["id"], record["properties"]
+                )
+                for record in result
+            ]
             return courses
         except Exception as e:
             raise RetrievingCourseFailed(f"{query} raised an error: \n {e}")
 
+    @staticmethod
+    def _find_courses_by_text_contained(
+        tx,
+        text_search_query: str,
+        offset: int,
+        limit: int,
+        fields: List[str],
+    ) -> List[Course]:
+        query = (
+            "MATCH (cou:Course) WHERE cou.description CONTAINS $text_search_query "
+            f"RETURN id(cou) AS id, {_projection('cou', COURSE_FIELDS, fields)} AS properties "
+            "ORDER BY id SKIP $offset"
+        )
+        if limit is not None:
+            query += " LIMIT $limit"
+
+        try:
+            result = tx.run(
+                query,
+                text_search_query=text_search_query,
+                offset=offset,
+                limit=limit,
+            )
+
+            return [
+                Course.fromDatabaseProperties(
+                    record["id"], record["properties"]
+                )
+                for record in result
+            ]
+        except Exception as e:
+            raise RetrievingCourseFailed(f"{query} raised an error: \n {e}")
+
+    @staticmethod
+    def _get_index_state(tx, name: str) -> Optional[str]:
+        record = tx.run(
+            "SHOW INDEXES YIELD name, state WHERE name = $name RETURN state",
+            name=name,
+        ).single()
+        return record["state"] if record else None
+
+    def is_course_fulltext_index_online(self) -> bool:
+        """Check whether the fulltext index "course_description_fulltext" can be used to search Courses. If it does
+        not exist yet (e.g. because the Database was not reachable when creating the schema at startup), it is
+        created, but only used once it has been populated.
+
+        :raises RetrievingCourseFailed: if checking or creating the index failed
+
+        :return: True if the index is online
+        :rtype: bool
+        """
+        global _course_fulltext_index_online
+
+        if _course_fulltext_index_online:
+            return True
+
+        try:
+            state = self._read_transaction(
+                self._get_index_state, COURSE_FULLTEXT_INDEX
+            )
+            if state is None:
+                with self.driver.session(
+                    default_access_mode=WRITE_ACCESS
+                ) as session:
+                    session.run(COURSE_FULLTEXT_INDEX_QUERY).consume()
+        except ClientError as e:
+            raise RetrievingCourseFailed(
+                f"Checking the index {COURSE_FULLTEXT_INDEX} raised an error: \n {e}"
+            )
+
+        _course_fulltext_index_online = state == "ONLINE"
+        return _course_fulltext_index_online
+
     def find_courses_by_text_query(
-        self, text_search_query: str
+        self,
+        text_search_query: str,
+        offset: int = 0,
+        limit: int = None,
+        fields: List[str] = None,
     ) -> List[Course]:
         """Find courses by text query. The query will be used for a full-text search on the course
-        descriptions, looking for exact matches of the query in the descriptions (e.g. search is case-sensitive).
+        descriptions using the fulltext index "course_description_fulltext", looking for descriptions that contain
+        all words of the query. The search is case-insensitive and uses the German analyzer of Lucene, so that
+        stopwords are ignored and inflected forms of a word match each other (e.g. "Kurs" and "Kurse").
+        The courses are ranked by their relevance (BM25), the most relevant course first.
+        As long as the index is not online (see :meth:`is_course_fulltext_index_online`), the courses whose
+        description contains the query are returned instead, ordered by their id.
 
         :param text_search_query: text query
         :type text_search_query: str
+        :param offset: number of the most relevant courses to skip
+        :type offset: int
+        :param limit: maximum number of courses, all matching courses by default
+        :type limit: int
+        :param fields: fields of the courses to retrieve (see :data:`app.models.COURSE_FIELDS`), all by default
+        :type fields: List[str]
 
         :raises RetrievingCourseFailed: if communication with the database goes wrong
 
         :return: Matching courses
         :rtype: List[Course]
         """
-        with self.driver.session() as session:
-            courses = session.write_transaction(
-                self._find_courses_by_text_query, text_search_query
+        if not self.is_course_fulltext_index_online():
+            return self._read_transaction(
+                self._find_courses_by_text_contained,
+                text_search_query,
+                offset,
+                limit,
+                fields,
             )
-            return courses
+
+        courses = self._read_transaction(
+            self._find_courses_by_text_query,
+            text_search_query,
+            offset,
+            limit,
+            fields,
+        )
+        return courses
 
     @staticmethod
     def _find_competencies_by_text_query(
-        tx, text_search_query: str
+        tx,
+        text_search_query: str,
+        after_id: int,
+        limit: int,
+        fields: List[str],
     ) -> List[Competency]:
         prepocessor = PreprocessorGerman()
         processed_search_query = prepocessor.preprocess_texts(
@@ -456,10 +1184,16 @@ class GraphDatabaseConnection:
         )
         processed_search_query = " ".join(processed_search_query[0])
 
-        query = (
-            "MATCH (com:Competency) WHERE com.description CONTAINS $text_search_query RETURN com AS competency"
+        query = _paged_query(
+            "CALL { "
+            "MATCH (com:Competency) WHERE com.description CONTAINS $text_search_query RETURN com"
             " UNION "
-            "MATCH (lab:Label)<-[:IDENTIFIED_BY]-(com:Competency) WHERE lab.text CONTAINS $processed_search_query RETURN com AS competency"
+            "MATCH (lab:Label)<-[:IDENTIFIED_BY]-(com:Competency) WHERE lab.text CONTAINS $processed_search_query RETURN com"
+            " }",
+            "com",
+            COMPETENCY_FIELDS,
+            fields,
+            limit,
         )
 
         try:
@@ -467,13 +1201,18 @@ class GraphDatabaseConnection:
                 query,
                 text_search_query=text_search_query,
                 processed_search_query=processed_search_query,
+                after_id=after_id,
+                limit=limit,
             )
 
             if not result:
                 return None
 
             competencies = [
-                Competency.fromDatabaseRecord(record) for record in result
+                Competency.fromDatabaseProperties(
+                    record["id"], record["properties"]
+                )
+                for record in result
             ]
             return competencies
         except Exception as e:
@@ -482,39 +1221,67 @@ class GraphDatabaseConnection:
             )
 
     def find_competencies_by_text_query(
-        self, text_search_query: str
+        self,
+        text_search_query: str,
+        after_id: int = -1,
+        limit: int = None,
+        fields: List[str] = None,
     ) -> List[Competency]:
         """Find all competencies by text query. The competencies will be retrieved either by
         searching for an exact match in the competency description (case-sensitive in this case), or
         by using the preprocessing pipeline to preprocess the text and then search for all labels that contain
-        the preprocessed search query and returning their associated competencies.
+        the preprocessed search query and returning their associated competencies. The competencies are ordered
+        by their ID.
 
         :param text_search_query: sequence of words
         :type text_search_query: str
+        :param after_id: only competencies with a greater ID are returned
+        :type after_id: int
+        :param limit: maximum number of competencies, all matching competencies by default
+        :type limit: int
+        :param fields: fields of the competencies to retrieve (see :data:`app.models.COMPETENCY_FIELDS`),
+            all by default
+        :type fields: List[str]
 
         :raises RetrievingCompetencyFailed: if communication with the database goes wrong
 
         :return: Matching competencies
         :rtype: List[Competency]
         """
-        with self.driver.session() as session:
-            competencies = session.write_transaction(
-                self._find_competencies_by_text_query, text_search_query
-            )
-            return competencies
+        competencies = self._read_transaction(
+            self._find_competencies_by_text_query,
+            text_search_query,
+            after_id,
+            limit,
+            fields,
+        )
+        return competencies
 
     @staticmethod
-    def _find_competencies_by_course(tx, course_id: int) -> Competency:
-        query = "MATCH (com:Competency)<-[:MATCHES]-(cou:Course) where id(cou)=$id RETURN com AS competency"
+    def _find_competencies_by_course(
+        tx, course_id: int, after_id: int, limit: int, fields: List[str]
+    ) -> Competency:
+        query = _paged_query(
+            "MATCH (com:Competency)<-[:MATCHES]-(cou:Course) where id(cou)=$id",
+            "com",
+            COMPETENCY_FIELDS,
+            fields,
+            limit,
+        )
 
         try:
-            result = tx.run(query, id=course_id)
+            result = tx.run(
+                query, id=course_id, after_id=after_id, limit=limit
+            )
 
             if not result:
                 return None
 
             competencies = [
-                Competency.fromDatabaseRecord(record) for record in result
+                Competency.fromDatabaseProperties(
+                    record["id"], record["properties"]
+                )
+                for record in result
             ]
 
             return competencies
@@ -523,19 +1290,114 @@ class GraphDatabaseConnection:
                 f"{query} raised an error: \n {e}"
             )
 
-    def find_competencies_by_course(self, course_id: int) -> List[Competency]:
+    def find_competencies_by_course(
+        self,
+        course_id: int,
+        after_id: int = -1,
+        limit: int = None,
+        fields: List[str] = None,
+    ) -> List[Competency]:
         """Find competencies by matching the course that they are connected to provided by it's ID.
+        The competencies are ordered by their ID.
 
         :param course_id: id of the course
         :type course_id: int
+        :param after_id: only competencies with a greater ID are returned
+        :type after_id: int
+        :param limit: maximum number of competencies, all matching competencies by default
+        :type limit: int
+        :param fields: fields of the competencies to retrieve (see :data:`app.models.COMPETENCY_FIELDS`),
+            all by default
+        :type fields: List[str]
 
         :raise RetrievingCompetencyFailed: if communication with the database goes wrong
 
         :returns: Matching competencies
         :rtype: List[Competency]
         """
-        with self.driver.session() as session:
-            competencies = session.write_transaction(
-                self._find_competencies_by_course, course_id
+        competencies = self._read_transaction(
+            self._find_competencies_by_course,
+            course_id,
+            after_id,
+            limit,
+            fields,
+        )
+        return competencies
+
+    def retrieve_courses_with_competencies(
+        self, after_id: int = -1, limit: int = 500
+    ) -> List[Course]:
+        """Queries a page of courses together with their competencies using a single query.
+        The courses are ordered by their ID.
+
+        :param after_id: only courses with a greater ID are returned
+        :type after_id: int
+        :param limit: maximum number of courses
+        :type limit: int
+
+        :raises RetrievingCourseFailed: if communication with the database goes wrong
+
+        :return: Courses with their competencies
+        :rtype: List[Course]
+        """
+        courses = self._read_transaction(
+            self._retrieve_courses_with_competencies, after_id, limit
+        )
+        return courses
+
+    @staticmethod
+    def _retrieve_courses_with_competencies(
+        tx, after_id: int, limit: int
+    ) -> List[Course]:
+        query = (
+            "MATCH (cou:Course) WHERE id(cou) > $after_id "
+            "WITH cou ORDER BY id(cou) LIMIT $limit "
+            "OPTIONAL MATCH (cou)-[:MATCHES]->(com:Competency) "
+            "RETURN cou AS course, collect(com) AS competencies ORDER BY id(course)"
+        )
+
+        try:
+            result = tx.run(query, after_id=after_id, limit=limit)
+
+            courses = [
+                Course.fromDatabaseNode(
+                    record["course"],
+                    [
+                        Competency.fromDatabaseNode(competency)
+                        for competency in record["competencies"]
+                    ],
+                )
+                for record in result
+            ]
+            return courses
+        except Exception as e:
+            raise RetrievingCourseFailed(f"{query} raised an error: \n {e}")
+
+    def iterate_courses_with_competencies(
+        self, page_size: int = None
+    ) -> Iterator[Course]:
+        """Iterates over all courses together with their competencies. The courses are queried in pages
+        (see :meth:`retrieve_courses_with_competencies`), so only one page is kept in memory at a time.
+
+        :param page_size: number of courses per page, defaults to the environment variable "EXPORT_PAGE_SIZE" or 500
+        :type page_size: int
+
+        :raises RetrievingCourseFailed: if communication with the database goes wrong
+
+        :return: All courses with their competencies, ordered by their ID
+        :rtype: Iterator[Course]
+        """
+        if not page_size:
+            page_size = int(os.environ.get("EXPORT_PAGE_SIZE", 500))
+
+        after_id = -1
+        while True:
+            courses = self.retrieve_courses_with_competencies(
+                after_id, page_size
             )
-            return competencies
+            yield from courses
+
+            if len(courses) < page_size:
+                return
+
+            after_id = courses[-1].id
@@ -0,0 +1,96 @@
+"""
+exporter.py
+====================================
+Exports Courses with their Competencies. The Courses are serialized one at a time, so that the export can be streamed
+to an HTTP response or a File without keeping all Courses in memory.
+"""
+
+from typing import Dict, Iterable, Iterator, Tuple, Type
+import json
+from app.models import Course
+
+# supported export formats and their mimetypes
+EXPORT_FORMATS = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+
+class ExportFormatNotSupported(Exception):
+    """Raised when an export format is not supported"""
+
+    pass
+
+
+def serialize_courses(
+    courses: Iterable[Course],
+    export_format: str = "json",
+    errors: Tuple[Type[Exception], ...] = (),
+) -> Iterator[str]:
+    """
+    Serialize Courses incrementally, either as one JSON array ("json") or as one JSON object per line ("ndjson").
+
+    :param courses: The Courses, e.g. from :meth:`app.db.GraphDatabaseConnection.iterate_courses_with_competencies`
+    :type courses: Iterable[Course]
+    :param export_format: Either "json" or "ndjson"
+    :type export_format: str
+    :param errors: Errors raised while retrieving the Courses that end the export with an object containing the
+        error (``{"error": ...}``) as last item instead of being raised, so that a streamed export is still valid JSON
+    :type errors: Tuple[Type[Exception], ...]
+
+    :raises ExportFormatNotSupported: if the export format is not supported
+
+    :return: Chunks of the serialized Courses
+    :rtype: Iterator[str]
+    """
+    # checked before the first chunk is requested
+    if export_format not in EXPORT_FORMATS:
+        raise ExportFormatNotSupported(
+            f"Export format '{export_format}' is not supported. Expected one of {', '.join(EXPORT_FORMATS)}."
+        )
+
+    items = _iterate_courses_as_json(courses, errors)
+
+    if export_format == "ndjson":
+        return (json.dumps(item) + "\n" for item in items)
+
+    return _serialize_items_as_array(items)
+
+
+def _iterate_courses_as_json(
+    courses: Iterable[Course], errors: Tuple[Type[Exception], ...]
+) -> Iterator[Dict]:
+    try:
+        for course in courses:
+            yield course.toJSON()
+    except errors as e:
+        yield {"error": str(e)}
+
+
+def _serialize_items_as_array(items: Iterable[Dict]) -> Iterator[str]:
+    yield "["
+    for i, item in enumerate(items):
+        yield ("," if i > 0 else "") + json.dumps(item)
+    yield "]"
+
+
+def write_courses(
+    courses: Iterable[Course], file_path: str, export_format: str = "json"
+) -> None:
+    """
+    Write Courses into a File (see :func:`serialize_courses`).
+
+    :param courses: The Courses
+    :type courses: Iterable[Course]
+    :param file_path: Path of the File
+    :type file_path: str
+    :param export_format: Either "json" or "ndjson"
+    :type export_format: str
+
+    :raises ExportFormatNotSupported: if the export format is not supported
+    """
+    chunks = serialize_courses(courses, export_format)
+
+    with open(file_path, "w") as f:
+        for chunk in chunks:
+            f.write(chunk)
@@ -0,0 +1,141 @@
+"""
+extraction.py
+====================================
+Extracts the Competencies of many Course descriptions without storing the Courses in the Database. The descriptions
+are read incrementally (from a JSON array or one JSON value per line) and passed through the Competency Extractor in
+chunks, so that the results of the first chunks can be sent while the remaining descriptions are still being read.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, Union
+from itertools import islice
+import json
+import os
+from app.competency_extractor import CompetencyExtractorInterface
+
+
+class ExtractionInputInvalid(Exception):
+    """Raised when the Course descriptions to extract Competencies from couldn't be read"""
+
+    pass
+
+
+def _get_course_description(index: int, item: Any) -> str:
+    """Returns the Course description of an item, which is either the description itself or an object with the
+    description as "courseDescription" (like the body of POST /courses)."""
+    if isinstance(item, dict):
+        item = item.get("courseDescription")
+
+    if not isinstance(item, str):
+        raise ExtractionInputInvalid(
+            f"Course description {index} is invalid. Expected a string or an object with 'courseDescription'."
+        )
+
+    return item
+
+
+def iterate_json_descriptions(body: Union[str, bytes]) -> Iterator[str]:
+    """
+    Read the Course descriptions of a JSON array.
+
+    :param body: The JSON array of descriptions (or objects with the description as "courseDescription")
+    :type body: Union[str, bytes]
+
+    :raises ExtractionInputInvalid: if the body is not a JSON array of Course descriptions
+
+    :return: The Course descriptions
+    :rtype: Iterator[str]
+    """
+    try:
+        items = json.loads(body)
+    except ValueError as e:
+        raise ExtractionInputInvalid(f"Reading the JSON array failed: {e}")
+
+    if not isinstance(items, list):
+        raise ExtractionInputInvalid(
+            "Reading the JSON array failed: Expected an array of course descriptions."
+        )
+
+    return (
+        _get_course_description(index, item)
+        for index, item in enumerate(items)
+    )
+
+
+def iterate_ndjson_descriptions(
+    lines: Iterable[Union[str, bytes]]
+) -> Iterator[str]:
+    """
+    Read the Course descriptions of newline delimited JSON, one line at a time. Empty lines are skipped.
+
+    :param lines: The lines, each containing a description (or an object with the description as "courseDescription")
+    :type lines: Iterable[Union[str, bytes]]
+
+    :raises ExtractionInputInvalid: if a line does not contain a Course description
+
+    :return: The Course descriptions
+    :rtype: Iterator[str]
+    """
+    index = 0
+
+    for line in lines:
+        if not line.strip():
+            continue
+
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            raise ExtractionInputInvalid(
+                f"Reading course description {index} failed: {e}"
+            )
+
+        yield _get_course_description(index, item)
+        index += 1
+
+
+def extract_courses(
+    course_descriptions: Iterable[str],
+    competency_extractor: CompetencyExtractorInterface,
+    chunk_size: int = None,
+) -> Iterator[Dict]:
+    """
+    Extract the Competencies of Course descriptions, one chunk of descriptions at a time. Nothing is written to the
+    Database.
+
+    :param course_descriptions: The descriptions of the Courses
+    :type course_descriptions: Iterable[str]
+    :param competency_extractor: The Competency Extractor to use
+    :type competency_extractor: CompetencyExtractorInterface
+    :param chunk_size: Number of descriptions per chunk, defaults to the environment variable "EXTRACT_CHUNK_SIZE"
+        or 100
+    :type chunk_size: int
+
+    :raises ExtractionInputInvalid: if reading the descriptions failed, the results of the previous chunks have
+        already been returned
+
+    :return: For each description its position and the extracted Competencies as JSON, in the order of the
+        descriptions
+    :rtype: Iterator[Dict]
+    """
+    if not chunk_size:
+        chunk_size = int(os.environ.get("EXTRACT_CHUNK_SIZE", 100))
+
+    descriptions = iter(course_descriptions)
+    index = 0
+
+    while True:
+        chunk = list(islice(descriptions, chunk_size))
+        if len(chunk) == 0:
+            return
+
+        associated_competencies = competency_extractor.extract_competencies(
+            chunk
+        )
+
+        for competencies in associated_competencies:
+            yield {
+                "index": index,
+                "competencies": [
+                    competency.toJSON() for competency in competencies
+                ],
+            }
+            index += 1
@@ -0,0 +1,206 @@
+"""
+importer.py
+====================================
+Imports Courses from XML Files into the Database. The XML File is parsed incrementally and the Courses are passed
+through the Competency Extractor and inserted into the Database in chunks, so that the memory needed does not grow
+with the size of the File and the first Courses are stored while the rest of the File is still being processed.
+"""
+
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List
+from itertools import islice
+import os
+import xml.etree.ElementTree as ET
+from app.competency_extractor import CompetencyExtractorInterface
+from app.db import GraphDatabaseConnection
+
+# maximum length of the descriptions of conflicting Courses reported in the result of an import
+CONFLICT_DESCRIPTION_LENGTH = 100
+
+
+class CourseImportFailed(Exception):
+    """Raised when the XML File couldn't be read"""
+
+    pass
+
+
+class CourseImportResult:
+    """
+    Defines the data structure for the (intermediate) result of a Course import.
+
+    :ivar processed: Number of Courses that have been processed so far
+    :type processed: int
+    :ivar imported: Number of Courses that have been inserted into the Database
+    :type imported: int
+    :ivar competencies: Number of Competencies that have been extracted from the inserted Courses
+    :type competencies: int
+    :ivar conflicts: Position and (shortened) description of the first Courses that already existed in the Database
+    :type conflicts: List[Tuple[int, str]]
+    :ivar conflict_count: Number of all Courses that already existed in the Database
+    :type conflict_count: int
+
+    :param max_conflicts: Maximum number of conflicts to keep, so that the result does not grow with the number of
+        Courses, defaults to the environment variable "IMPORT_MAX_CONFLICTS" or 100
+    :type max_conflicts: int
+    """
+
+    def __init__(self, max_conflicts: int = None):
+        self.processed = 0
+        self.imported = 0
+        self.competencies = 0
+        self.conflicts = []
+        self.conflict_count = 0
+        self.max_conflicts = (
+            max_conflicts
+            if max_conflicts is not None
+            else int(os.environ.get("IMPORT_MAX_CONFLICTS", 100))
+        )
+
+    def add_conflict(self, index: int, description: str) -> None:
+        """
+        Report a Course that already existed in the Database. Only the first `max_conflicts` conflicts are kept,
+        with their description shortened to :data:`CONFLICT_DESCRIPTION_LENGTH` characters.
+
+        :param index: Position of the Course
+        :type index: int
+        :param description: Description of the Course
+        :type description: str
+        """
+        self.conflict_count += 1
+
+        if len(self.conflicts) < self.max_conflicts:
+            if len(description) > CONFLICT_DESCRIPTION_LENGTH:
+                description = description[:CONFLICT_DESCRIPTION_LENGTH] + "..."
+            self.conflicts.append((index, description))
+
+    def toJSON(self) -> Dict:
+        """
+        Serializes the result into JSON format.
+
+        :return: The result serialized as JSON
+        :rtype: Dict
+        """
+        return {
+            "processed": self.processed,
+            "imported": self.imported,
+            "competencies": self.competencies,
+            "conflictCount": self.conflict_count,
+            "conflicts": [
+                {"index": index, "description": description}
+                for index, description in self.conflicts
+            ],
+        }
+
+
+def iterate_course_descriptions(xml_file: BinaryIO) -> Iterator[str]:
+    """
+    Parse an XML File incrementally and yield the long description ("CS_DESC_LONG") of each "COURSE" element.
+    Every "COURSE" element is removed from the parsed tree as soon as its description has been read.
+    Courses with an empty description are skipped.
+
+    :param xml_file: The XML File
+    :type xml_file: BinaryIO
+
+    :raises CourseImportFailed: if the File is not a correctly formatted XML File
+
+    :return: The descriptions of the Courses in the order they appear in the File
+    :rtype: Iterator[str]
+    """
+    ancestors = []
+
+    try:
+        for event, element in ET.iterparse(
+            xml_file,
+            events=("start", "end"),
+            parser=ET.XMLParser(encoding="utf-8"),
+        ):
+            if event == "start":
+                ancestors.append(element)
+                continue
+
+            ancestors.pop()
+            if element.tag != "COURSE":
+                continue
+
+            course_description = element.find("CS_DESC_LONG").text
+
+            if len(ancestors) > 0:
+                ancestors[-1].remove(element)
+            element.clear()
+
+            if course_description:
+                yield course_description
+    except (ET.ParseError, AttributeError) as e:
+        raise CourseImportFailed(f"Reading the XML File failed: {e}")
+
+
+def _chunks(items: Iterable, chunk_size: int) -> Iterator[List]:
+    iterator = iter(items)
+    chunk = list(islice(iterator, chunk_size))
+    while len(chunk) > 0:
+        yield chunk
+        chunk = list(islice(iterator, chunk_size))
+
+
+def import_courses(
+    course_descriptions: Iterable[str],
+    extractor: str,
+    competency_extractor: CompetencyExtractorInterface,
+    db: GraphDatabaseConnection,
+    chunk_size: int = None,
+    on_progress: Callable[[CourseImportResult], None] = None,
+) -> CourseImportResult:
+    """
+    Extract the Competencies of Course descriptions and insert the Courses into the Database, one chunk of Courses
+    at a time. Courses that already exist in the Database are reported as conflicts.
+
+    :param course_descriptions: The descriptions of the Courses, e.g. from :func:`iterate_course_descriptions`
+    :type course_descriptions: Iterable[str]
+    :param extractor: Name of the Competency Extractor (e.g. paper or ml)
+    :type extractor: str
+    :param competency_extractor: The Competency Extractor to use
+    :type competency_extractor: CompetencyExtractorInterface
+    :param db: The Database Connection to insert the Courses with
+    :type db: GraphDatabaseConnection
+    :param chunk_size: Number of Courses per chunk, defaults to the environment variable "IMPORT_CHUNK_SIZE" or 100
+    :type chunk_size: int
+    :param on_progress: Called after each chunk with the result so far
+    :type on_progress: Callable[[CourseImportResult], None]
+
+    :raises CourseImportFailed: if reading the Courses failed, the Courses of the previous chunks are kept
+    :raises CourseInsertionFailed: if insertion into DB failed
+
+    :return: The result of the import
+    :rtype: CourseImportResult
+    """
+    if not chunk_size:
+        chunk_size = int(os.environ.get("IMPORT_CHUNK_SIZE", 100))
+
+    result = CourseImportResult()
+
+    for chunk in _chunks(course_descriptions, chunk_size):
+        associated_competencies = competency_extractor.extract_competencies(
+            chunk
+        )
+
+        (courses, conflicts) = db.create_courses(
+            [
+                (course_description, extractor, associated_competencies[i])
+                for i, course_description in enumerate(chunk)
+            ]
+        )
+
+        conflicts = set(conflicts)
+        for i in sorted(conflicts):
+            result.add_conflict(result.processed + i, chunk[i])
+        result.competencies += sum(
+            len(associated_competencies[i])
+            for i in range(len(chunk))
+            if i not in conflicts
+        )
+        result.imported += len(courses)
+        result.processed += len(chunk)
+
+        if on_progress:
+            on_progress(result)
+
+    return result
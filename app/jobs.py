@@ -0,0 +1,403 @@
+"""
+jobs.py
+====================================
+Runs long running tasks (e.g. importing Courses from XML Files or initializing the Store) as Jobs in the background,
+so that the request that started them can return immediately and the progress can be queried afterwards.
+The Jobs run in separate processes, and their state is kept in an SQLite File shared by all processes.
+"""
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+import json
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+# fields of a Job that are stored in the SQLite File
+JOB_FIELDS = [
+    "name",
+    "status",
+    "progress",
+    "result",
+    "error",
+    "created",
+    "started",
+    "finished",
+]
+
+
+class Job:
+    """
+    Defines the data structure for a Job that runs in the background.
+
+    :param name: Name of the task the Job runs (e.g. "import-courses")
+    :type name: str
+    :param job_store: The JobStore that the progress of the Job is saved to, if any
+    :type job_store: JobStore
+    :ivar id: Unique id of the Job
+    :type id: str
+    :ivar status: Either "queued", "running", "finished", "failed" or "cancelled"
+    :type status: str
+    :ivar progress: Counters describing the progress of the Job, e.g. the number of processed Courses
+    :type progress: Dict[str, Any]
+    :ivar result: The result of the Job once it has finished
+    :type result: Any
+    :ivar error: The error message if the Job has failed
+    :type error: str
+    """
+
+    def __init__(self, name: str, job_store: "JobStore" = None):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.status = "queued"
+        self.progress: Dict[str, Any] = {}
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.job_store = job_store
+
+    def update_progress(self, **progress) -> None:
+        """
+        Update the progress counters of the Job.
+
+        :param progress: The counters to update
+        :type progress: Dict[str, Any]
+        """
+        self.progress = {**self.progress, **progress}
+
+        if self.job_store:
+            self.job_store.save(self)
+
+    def toJSON(self) -> Dict:
+        """
+        Serializes the Job into JSON format. If the progress contains the number of processed items,
+        the throughput in items per second is added.
+
+        :return: The Job serialized as JSON
+        :rtype: Dict
+        """
+        progress = dict(self.progress)
+
+        if self.started and "processed" in progress:
+            duration = (self.finished or time.time()) - self.started
+            progress["throughput"] = (
+                progress["processed"] / duration if duration > 0 else 0
+            )
+
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "progress": progress,
+            "result": self.result,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class JobStore:
+    """
+    Keeps the state of Jobs in an SQLite File, so that it is shared by all processes. Each process opens its own
+    connection to the SQLite File, also when the JobStore has been created before forking the process.
+
+    :param file_path: Path of the SQLite File
+    :type file_path: str
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self._connection = None
+        self._connection_pid = None
+
+    def save(self, job: Job) -> None:
+        """
+        Insert or update the state of a Job.
+
+        :param job: The Job
+        :type job: Job
+        """
+        with self._lock:
+            connection = self._get_connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO jobs (id, status, created, job) VALUES (?, ?, ?, ?)",
+                (
+                    job.id,
+                    job.status,
+                    job.created,
+                    json.dumps(
+                        {field: getattr(job, field) for field in JOB_FIELDS}
+                    ),
+                ),
+            )
+            connection.commit()
+
+    def load(self, job_id: str) -> Optional[Job]:
+        """
+        Get the state of a Job.
+
+        :param job_id: Id of the Job
+        :type job_id: str
+        :return: The Job, or None if there is no Job with that id
+        :rtype: Job
+        """
+        with self._lock:
+            row = (
+                self._get_connection()
+                .execute("SELECT job FROM jobs WHERE id = ?", (job_id,))
+                .fetchone()
+            )
+
+        if row is None:
+            return None
+
+        job = Job.__new__(Job)
+        job.id = job_id
+        job.job_store = self
+        for field, value in json.loads(row[0]).items():
+            setattr(job, field, value)
+
+        return job
+
+    def discard_finished_jobs(self, max_jobs: int) -> None:
+        """
+        Remove the oldest finished Jobs, so that at most `max_jobs` Jobs are kept (unless more of them have not
+        finished yet).
+
+        :param max_jobs: Maximum number of Jobs to keep
+        :type max_jobs: int
+        """
+        with self._lock:
+            connection = self._get_connection()
+            connection.execute(
+                "DELETE FROM jobs WHERE id IN (SELECT id FROM jobs "
+                "WHERE status IN ('finished', 'failed', 'cancelled') ORDER BY created "
+                "LIMIT max(0, (SELECT count(*) FROM jobs) - ?))",
+                (max_jobs,),
+            )
+            connection.commit()
+
+    def close(self) -> None:
+        """Closes the SQLite File."""
+        with self._lock:
+            if self._connection and self._connection_pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+
+    def _get_connection(self) -> sqlite3.Connection:
+        # a connection must not be used by a forked process
+        if self._connection is None or self._connection_pid != os.getpid():
+            self._connection = sqlite3.connect(
+                self.file_path, check_same_thread=False, timeout=30
+            )
+            self._connection_pid = os.getpid()
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs "
+                "(id TEXT PRIMARY KEY, status TEXT NOT NULL, created REAL NOT NULL, job TEXT NOT NULL)"
+            )
+            self._connection.commit()
+
+        return self._connection
+
+
+class JobManager:
+    """
+    The JobManager runs Jobs on a pool of background processes and keeps track of them. Preprocessing texts and
+    extracting Competencies in a Job therefore does not slow down the requests handled by the worker process.
+    The processes are started by a fork server (or spawned, where it is not available) on first use, so they load
+    the models and Files needed by the Jobs themselves. The state of the Jobs is kept in an SQLite File
+    (see :class:`JobStore`), so that every worker process can report the progress of a Job started by any of them.
+
+    :param max_workers: Maximum number of Jobs running at the same time in the pool of each worker process
+    :type max_workers: int
+    :param max_jobs: Maximum number of Jobs to keep, the oldest finished Jobs are discarded first
+    :type max_jobs: int
+    :param file_path: Path of the SQLite File, defaults to the environment variable "JOBS_FILE" or a File in the
+        directory for temporary Files
+    :type file_path: str
+    :param initializer: Called with `initargs` by each process of the pool before running Jobs, e.g. to share
+        objects of the worker process with it
+    :type initializer: Callable
+    :param initargs: Arguments of the initializer
+    :type initargs: Tuple
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_jobs: int = 100,
+        file_path: str = None,
+        initializer: Callable = None,
+        initargs: Tuple = (),
+    ):
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        self.job_store = JobStore(
+            file_path
+            or os.environ.get("JOBS_FILE")
+            or os.path.join(tempfile.gettempdir(), "jobs.sqlite")
+        )
+        self.initializer = initializer
+        self.initargs = initargs
+        self._executor: ProcessPoolExecutor = None
+        self._executor_pid = None
+        self._shut_down = False
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        name: str,
+        task: Callable[..., Any],
+        args: Tuple = (),
+        cleanup: Callable[[], None] = None,
+    ) -> Job:
+        """
+        Submit a task to run in the background as a new Job. The task runs in another process, so it has to be a
+        function defined at module level and its arguments have to be picklable.
+
+        :param name: Name of the task
+        :type name: str
+        :param task: The task, which is called with its Job (to report progress) and the arguments and returns the
+            result of the Job, which has to be serializable as JSON
+        :type task: Callable[..., Any]
+        :param args: Arguments of the task
+        :type args: Tuple
+        :param cleanup: Called by the worker process once the Job has finished, failed or has been cancelled before
+            it started (e.g. to remove the File the task would have read)
+        :type cleanup: Callable[[], None]
+        :return: The new Job
+        :rtype: Job
+        """
+        job = Job(name)
+        self.job_store.save(job)
+        self.job_store.discard_finished_jobs(self.max_jobs)
+
+        try:
+            future = self._get_executor().submit(_run_job, job.id, task, args)
+        except RuntimeError:
+            # the JobManager has been shut down
+            self._finish(job.id, "cancelled")
+            if cleanup:
+                cleanup()
+            raise
+
+        future.add_done_callback(
+            lambda future: self._done(job.id, future, cleanup)
+        )
+        return job
+
+    def get(self, job_id: str) -> Job:
+        """
+        Get a Job by its id.
+
+        :param job_id: Id of the Job
+        :type job_id: str
+        :return: The Job, or None if there is no Job with that id
+        :rtype: Job
+        """
+        return self.job_store.load(job_id)
+
+    def shutdown(self) -> None:
+        """Cancels all queued Jobs of the worker process and waits for its running Jobs to finish."""
+        with self._lock:
+            self._shut_down = True
+            executor = (
+                self._executor if self._executor_pid == os.getpid() else None
+            )
+
+        if executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        self.job_store.close()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._shut_down:
+                raise RuntimeError("The JobManager has been shut down.")
+
+            # the pool of the parent process can't be used after a fork
+            if self._executor is None or self._executor_pid != os.getpid():
+                context = multiprocessing.get_context(
+                    "forkserver"
+                    if "forkserver" in multiprocessing.get_all_start_methods()
+                    else "spawn"
+                )
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=context,
+                    initializer=_init_job_process,
+                    initargs=(
+                        self.job_store.file_path,
+                        self.initializer,
+                        self.initargs,
+                    ),
+                )
+                self._executor_pid = os.getpid()
+
+            return self._executor
+
+    def _done(
+        self, job_id: str, future: Future, cleanup: Callable[[], None]
+    ) -> None:
+        try:
+            if future.cancelled():
+                self._finish(job_id, "cancelled")
+            elif future.exception() is not None:
+                # the task could not be sent to the process or the process died
+                self._finish(job_id, "failed", error=str(future.exception()))
+        finally:
+            if cleanup:
+                cleanup()
+
+    def _finish(self, job_id: str, status: str, error: str = None) -> None:
+        job = self.job_store.load(job_id)
+        if job is None or job.status not in ("queued", "running"):
+            return
+
+        job.status = status
+        job.error = error
+        job.finished = time.time()
+        self.job_store.save(job)
+
+
+# the JobStore of a process of the pool used by the JobManager
+_job_store: JobStore = None
+
+
+def _init_job_process(
+    file_path: str, initializer: Callable, initargs: Tuple
+) -> None:
+    global _job_store
+    _job_store = JobStore(file_path)
+
+    if initializer:
+        initializer(*initargs)
+
+
+def _run_job(job_id: str, task: Callable[..., Any], args: Tuple) -> None:
+    job = _job_store.load(job_id)
+    if job is None:
+        # the Job has already been discarded
+        return
+
+    job.status = "running"
+    job.started = time.time()
+    _job_store.save(job)
+
+    try:
+        job.result = task(job, *args)
+        job.status = "finished"
+    except Exception as e:
+        job.error = str(e) or type(e).__name__
+        job.status = "failed"
+    finally:
+        job.finished = time.time()
+        _job_store.save(job)
@@ -0,0 +1,213 @@
+"""
+label_index.py
+====================================
+Provides an in-memory index over the preprocessed Labels of Competencies, which is used to answer the termStore and
+sequenceStore lookups without querying the Database for every single token.
+Furthermore, it contains a token-level trie over the label texts to match whole phrases at once and a trigram index
+to find terms that appear anywhere inside the label texts.
+"""
+
+from functools import cached_property
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+class PhraseTrie:
+    """
+    A token-level trie over label texts. Every label text is split into its tokens and each path from the root to a
+    node marked as the end of a label spells out one label.
+
+    :param sequences: Label texts whose tokens are separated by spaces
+    :type sequences: Iterable[str]
+    """
+
+    # tokens are always strings, so None can be used as key to mark the end of a label
+    _END = None
+
+    def __init__(self, sequences: Iterable[str]):
+        self.root = {}
+        for sequence in sequences:
+            node = self.root
+            for token in sequence.split(" "):
+                node = node.setdefault(token, {})
+            node[self._END] = True
+
+    def longest_match(self, tokenized_text: List[str], start: int) -> int:
+        """
+        Find the longest label that matches the tokenized text beginning at the given position.
+
+        :param tokenized_text: A tokenized text
+        :type tokenized_text: List[str]
+        :param start: Position of the first token of the phrase
+        :type start: int
+        :return: The (exclusive) end position of the longest matching label, or start if no label matches
+        :rtype: int
+        """
+        node = self.root
+        end = start
+        for i in range(start, len(tokenized_text)):
+            # a phrase matches a label if the tokens joined by spaces equal the label text
+            for token in tokenized_text[i].split(" "):
+                node = node.get(token)
+                if node is None:
+                    return end
+
+            if self._END in node:
+                end = i + 1
+
+        return end
+
+
+class SubstringIndex:
+    """
+    An index to check whether a term appears anywhere inside any of the indexed texts (the semantics of the Neo4J
+    ``CONTAINS`` operator). Every substring of length one or two is kept in a set. For longer terms, a posting list of
+    the texts containing each trigram is used to find the few texts that contain all trigrams of the term, which are
+    then verified to contain the term itself.
+
+    :param texts: The texts to index
+    :type texts: Iterable[str]
+    """
+
+    # number of candidate texts that are verified directly instead of intersecting further posting lists
+    _MAX_CANDIDATES = 16
+
+    def __init__(self, texts: Iterable[str]):
+        self.texts = list(texts)
+        self._short_substrings = set()
+        self._postings: Dict[str, List[int]] = {}
+
+        for i, text in enumerate(self.texts):
+            for n in (1, 2):
+                self._short_substrings.update(
+                    text[j : j + n] for j in range(len(text) - n + 1)
+                )
+
+            for trigram in {text[j : j + 3] for j in range(len(text) - 2)}:
+                self._postings.setdefault(trigram, []).append(i)
+
+    def contains(self, term: str) -> bool:
+        """
+        Check if a term appears inside any of the indexed texts.
+
+        :param term: The term
+        :type term: str
+        :return: True if the term appears in at least one text and False if not
+        :rtype: bool
+        """
+        if len(term) == 0:
+            return len(self.texts) > 0
+
+        if len(term) < 3:
+            return term in self._short_substrings
+
+        # start with the rarest trigram
+        postings = sorted(
+            (
+                self._postings.get(term[j : j + 3], [])
+                for j in range(len(term) - 2)
+            ),
+            key=len,
+        )
+        if len(postings[0]) == 0:
+            return False
+
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if len(candidates) <= self._MAX_CANDIDATES:
+                break
+
+            candidates.intersection_update(posting)
+
+        return any(term in self.texts[i] for i in candidates)
+
+
+class LabelIndex:
+    """
+    The LabelIndex holds the text of every Label in memory and answers the two lookups needed by the
+    :class:`app.competency_extractor.PaperCompetencyExtractor`: whether a term appears anywhere inside a label text
+    (the semantics of the Neo4J ``CONTAINS`` operator) and which values are associated with a label that exactly
+    matches a sequence.
+
+    :param labels: Pairs of a label text and the value associated with it (e.g. the id of the Competency it identifies)
+    :type labels: Iterable[Tuple[str, Any]]
+    :ivar sequences: A mapping of each label text to all values associated with it
+    :type sequences: Dict[str, List[Any]]
+    """
+
+    def __init__(self, labels: Iterable[Tuple[str, Any]]):
+        self.sequences: Dict[str, List[Any]] = {}
+        for text, value in labels:
+            self.sequences.setdefault(text, []).append(value)
+
+    def __len__(self) -> int:
+        return len(self.sequences)
+
+    def contains_term(self, term: str) -> bool:
+        """
+        Check if a term is contained in any label text.
+
+        :param term: A single term
+        :type term: str
+        :return: True if the term appears in at least one label text and False if not
+        :rtype: bool
+        """
+        return self.substring_index.contains(term)
+
+    @cached_property
+    def substring_index(self) -> SubstringIndex:
+        """
+        A :class:`SubstringIndex` over all label texts, which is built on first access.
+
+        :return: The substring index over all label texts
+        :rtype: SubstringIndex
+        """
+        return SubstringIndex(self.sequences.keys())
+
+    @cached_property
+    def phrase_trie(self) -> PhraseTrie:
+        """
+        A :class:`PhraseTrie` over all label texts, which is built on first access.
+
+        :return: The trie over all label texts
+        :rtype: PhraseTrie
+        """
+        return PhraseTrie(self.sequences.keys())
+
+    @cached_property
+    def token_index(self) -> Dict[str, List[str]]:
+        """
+        An inverted index mapping each token (i.e. each part of a label text separated by spaces) to the label texts
+        containing it, which is built on first access.
+
+        :return: The label texts of each token
+        :rtype: Dict[str, List[str]]
+        """
+        token_index: Dict[str, List[str]] = {}
+        for text in self.sequences.keys():
+            for token in dict.fromkeys(text.split(" ")):
+                token_index.setdefault(token, []).append(text)
+
+        return token_index
+
+    def contains_token(self, token: str) -> bool:
+        """
+        Check if a token is one of the tokens of any label text. Unlike :meth:`contains_term`, a token that only
+        appears as part of a token of a label text (e.g. "personal" in "musikpersonal") is not contained.
+
+        :param token: A single token
+        :type token: str
+        :return: True if the token is a token of at least one label text and False if not
+        :rtype: bool
+        """
+        return token in self.token_index
+
+    def find_sequence(self, sequence: str) -> List[Any]:
+        """
+        Find all values associated with the label text that exactly matches the sequence.
+
+        :param sequence: A sequence of words joined by spaces
+        :type sequence: str
+        :return: All values associated with the matching label, or an empty list if no label matches
+        :rtype: List[Any]
+        """
+        return self.sequences.get(sequence, [])
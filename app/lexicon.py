@@ -0,0 +1,215 @@
+"""
+lexicon.py
+====================================
+Contains a compact on-disk format for the Morphys lookup table. The lexicon is compiled once from the Morphys CSV File
+and consists of a sorted table of forms and their lemmas. It is opened using a memory map, so it does not have to be
+parsed at startup and all worker processes share the same copy of the File in the page cache.
+
+To compile the lexicon from the File set by the environment variable "MORPHYS_FILE" into the File set by the
+environment variable "MORPHYS_LEXICON_FILE", run::
+
+    python app/lexicon.py
+"""
+
+from typing import Iterable, Optional, Tuple
+from functools import lru_cache
+import mmap
+import os
+import struct
+import pandas as pd
+
+# identifies a compiled lexicon File, followed by the number of entries
+LEXICON_HEADER = struct.Struct("<8sI")
+LEXICON_MAGIC = b"MORPHLEX"
+LEXICON_OFFSET = struct.Struct("<I")
+
+
+class LexiconInvalid(Exception):
+    """Raised when a File is not a compiled lexicon"""
+
+    pass
+
+
+def compile_lexicon(entries: Iterable[Tuple[str, str]], file_path: str) -> int:
+    """
+    Compile (form, lemma) pairs into a lexicon File. If a form appears multiple times, the first lemma is used.
+    Forms without a lemma are kept, so that they are still known to the lexicon. Forms and lemmas that are not
+    strings (e.g. numbers) are converted to strings.
+
+    The File starts with a header, followed by the offsets of each entry and the entries themselves, which are
+    sorted by their UTF-8 encoded form. Each entry consists of the form and the lemma separated by a null byte.
+
+    :param entries: The (form, lemma) pairs, lemma may be None
+    :type entries: Iterable[Tuple[str, str]]
+    :param file_path: Path of the lexicon File to write
+    :type file_path: str
+    :return: Number of entries in the lexicon
+    :rtype: int
+    """
+    lexicon = {}
+    for form, lemma in entries:
+        form = str(form).encode("utf-8")
+        if form not in lexicon:
+            lexicon[form] = str(lemma).encode("utf-8") if lemma else b""
+
+    offsets = [0]
+    for form in sorted(lexicon):
+        offsets.append(offsets[-1] + len(form) + 1 + len(lexicon[form]))
+
+    with open(file_path, "wb") as f:
+        f.write(LEXICON_HEADER.pack(LEXICON_MAGIC, len(lexicon)))
+        for offset in offsets:
+            f.write(LEXICON_OFFSET.pack(offset))
+        for form in sorted(lexicon):
+            f.write(form + b"\0" + lexicon[form])
+
+    return len(lexicon)
+
+
+def read_morphys(morphys_file: str) -> pd.DataFrame:
+    """
+    Read the Morphys CSV File. Every cell is read as string, so that numeric forms (e.g. "1") are not parsed as
+    numbers and forms like "NA" are not parsed as missing values, empty cells are read as empty strings.
+    Both the compiled lexicon and the lemmatizer reading the CSV File directly use it, so they map the same forms to
+    the same lemmas.
+
+    :param morphys_file: Path of the Morphys CSV File
+    :type morphys_file: str
+    :return: The Morphys lookup table with the columns "form" and "lemma"
+    :rtype: pd.DataFrame
+    """
+    return pd.read_csv(
+        morphys_file,
+        encoding="utf-8",
+        index_col=0,
+        dtype=str,
+        keep_default_na=False,
+    )[["form", "lemma"]]
+
+
+def compile_morphys_lexicon(morphys_file: str, file_path: str) -> int:
+    """
+    Compile the Morphys CSV File (see :func:`read_morphys`) into a lexicon File (see :func:`compile_lexicon`).
+
+    :param morphys_file: Path of the Morphys CSV File
+    :type morphys_file: str
+    :param file_path: Path of the lexicon File to write
+    :type file_path: str
+    :return: Number of entries in the lexicon
+    :rtype: int
+    """
+    morphys = read_morphys(morphys_file)
+
+    return compile_lexicon(
+        (
+            (form, lemma or None)
+            for form, lemma in zip(morphys["form"], morphys["lemma"])
+            if form
+        ),
+        file_path,
+    )
+
+
+class Lexicon:
+    """
+    A read-only mapping of forms to lemmas, which is backed by a memory mapped lexicon File
+    (see :func:`compile_lexicon`). Lookups use a binary search over the sorted forms.
+
+    :param file_path: Path of the lexicon File
+    :type file_path: str
+    :param cache_size: Maximum number of lookups to keep in memory
+    :type cache_size: int
+
+    :raises LexiconInvalid: if the File is not a compiled lexicon
+    """
+
+    def __init__(self, file_path: str, cache_size: int = 100000):
+        with open(file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < LEXICON_HEADER.size:
+                raise LexiconInvalid(
+                    f"'{file_path}' is not a compiled lexicon."
+                )
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, self._size) = LEXICON_HEADER.unpack_from(self._mmap, 0)
+        if magic != LEXICON_MAGIC:
+            raise LexiconInvalid(f"'{file_path}' is not a compiled lexicon.")
+
+        self._entries_start = (
+            LEXICON_HEADER.size + (self._size + 1) * LEXICON_OFFSET.size
+        )
+        self._find = lru_cache(maxsize=cache_size)(self._find)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, form: str) -> bool:
+        return self._find(form) is not None
+
+    def __getitem__(self, form: str) -> Optional[str]:
+        lemma = self._find(form)
+        if lemma is None:
+            raise KeyError(form)
+
+        return lemma or None
+
+    def get(self, form: str, default: str = None) -> Optional[str]:
+        """
+        Get the lemma of a form.
+
+        :param form: The form
+        :type form: str
+        :param default: Returned if the form is not in the lexicon
+        :type default: str
+        :return: The lemma, None if the form has no lemma, or default if the form is not in the lexicon
+        :rtype: str
+        """
+        lemma = self._find(form)
+        if lemma is None:
+            return default
+
+        return lemma or None
+
+    def close(self) -> None:
+        """Closes the memory map of the lexicon File."""
+        self._mmap.close()
+
+    def _entry(self, i: int) -> Tuple[bytes, bytes]:
+        (start,) = LEXICON_OFFSET.unpack_from(
+            self._mmap, LEXICON_HEADER.size + i * LEXICON_OFFSET.size
+        )
+        (end,) = LEXICON_OFFSET.unpack_from(
+            self._mmap, LEXICON_HEADER.size + (i + 1) * LEXICON_OFFSET.size
+        )
+        (form, _, lemma) = self._mmap[
+            self._entries_start + start : self._entries_start + end
+        ].partition(b"\0")
+        return (form, lemma)
+
+    def _find(self, form: str) -> Optional[str]:
+        """Returns the lemma of a form ("" if it has none), or None if the form is not in the lexicon."""
+        key = form.encode("utf-8")
+        low = 0
+        high = self._size
+
+        while low < high:
+            middle = (low + high) // 2
+            (entry_form, lemma) = self._entry(middle)
+
+            if entry_form < key:
+                low = middle + 1
+            elif entry_form > key:
+                high = middle
+            else:
+                return lemma.decode("utf-8")
+
+        return None
+
+
+if __name__ == "__main__":
+    size = compile_morphys_lexicon(
+        os.environ.get("MORPHYS_FILE"), os.environ.get("MORPHYS_LEXICON_FILE")
+    )
+    print(
+        f"Compiled {size} forms into '{os.environ.get('MORPHYS_LEXICON_FILE')}'."
+    )
@@ -0,0 +1,108 @@
+"""
+model_manager.py
+====================================
+Loads the spaCy models used by the Competency Extractors once per process and shares them between all extractors.
+When the application is preloaded before forking the worker processes (e.g. using the "--preload" option of
+gunicorn), the models are loaded by the master process and the forked workers share the loaded weights.
+"""
+
+from typing import Dict, List, Optional
+import logging
+import os
+import threading
+import time
+import spacy
+
+logger = logging.getLogger(__name__)
+
+
+def _get_resident_memory() -> Optional[int]:
+    """Returns the resident memory of the current process in bytes, or None if it can't be measured (e.g. on
+    Windows)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    # only the peak resident memory (in kilobytes) is available
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class SpacyModelManager:
+    """
+    The SpacyModelManager loads each spaCy model on first use and keeps it for the lifetime of the process.
+    For every loaded model the time it took to load and the memory it occupies are recorded.
+
+    :ivar models: The loaded models by the path they have been loaded from
+    :type models: Dict[str, spacy.Language]
+    """
+
+    def __init__(self):
+        self.models: Dict[str, spacy.Language] = {}
+        self._stats: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> spacy.Language:
+        """
+        Get a spaCy model, which is loaded on first use.
+
+        :param path: Path of the model
+        :type path: str
+        :return: The shared model
+        :rtype: spacy.Language
+        """
+        model = self.models.get(path)
+        if model is None:
+            with self._lock:
+                model = self.models.get(path)
+                if model is None:
+                    model = self._load(path)
+
+        return model
+
+    def stats(self) -> List[Dict]:
+        """
+        Get the path, the id of the process that loaded it (the master process if the application has been
+        preloaded), the load time (in seconds), the memory (in bytes, measured as the growth of the resident memory
+        of the process while loading, None if it can't be measured) and the pipeline of each loaded model.
+
+        :return: The statistics of each loaded model
+        :rtype: List[Dict]
+        """
+        return list(self._stats.values())
+
+    def _load(self, path: str) -> spacy.Language:
+        memory = _get_resident_memory()
+        start = time.perf_counter()
+
+        model = spacy.load(path)
+
+        self._stats[path] = {
+            "path": path,
+            "pid": os.getpid(),
+            "loadTime": time.perf_counter() - start,
+            "memory": (
+                max(0, _get_resident_memory() - memory)
+                if memory is not None
+                else None
+            ),
+            "pipeline": model.pipe_names,
+        }
+        self.models[path] = model
+
+        memory = self._stats[path]["memory"]
+        logger.info(
+            f"Loaded spaCy model '{path}' in {self._stats[path]['loadTime']:.2f}s"
+            + (f" ({memory / 2 ** 20:.1f} MiB)" if memory is not None else "")
+        )
+        return model
+
+
+# the model manager shared by the whole process
+model_manager = SpacyModelManager()
@@ -4,8 +4,29 @@ models.py
 Defines models as the essential data structures for the domain of the system.
 """
 
-from typing import Dict, List
+from typing import Dict, List, Mapping
 from neo4j import Record
+from neo4j.graph import Node
+
+# Fields of a Competency that can be selected when retrieving competencies, besides its id
+COMPETENCY_FIELDS = (
+    "skillType",
+    "conceptType",
+    "conceptUri",
+    "reuseLevel",
+    "preferredLabel",
+    "altLabels",
+    "hiddenLabels",
+    "status",
+    "modifiedDate",
+    "scopeNote",
+    "definition",
+    "inScheme",
+    "description",
+)
+
+# Fields of a Course that can be selected when retrieving courses, besides its id
+COURSE_FIELDS = ("description", "extractor")
 
 
 class Label:
@@ -67,37 +88,73 @@ class Competency:
         :param record: A Neo4J Database Record
         :type record: neo4j.Record
 
+        :return: A new instance of a Competency
+        :rtype: Competency
+        """
+        return Competency.fromDatabaseNode(record["competency"])
+
+    @staticmethod
+    def fromDatabaseNode(node: Node):
+        """
+        Initializes a new instance of a Competency using a Neo4J Database Node.
+
+        :param node: A Neo4J Database Node with the label Competency
+        :type node: neo4j.graph.Node
+
+        :return: A new instance of a Competency
+        :rtype: Competency
+        """
+        return Competency.fromDatabaseProperties(node.id, node._properties)
+
+    @staticmethod
+    def fromDatabaseProperties(id: int, properties: Mapping):
+        """
+        Initializes a new instance of a Competency using the id and the properties of a Neo4J Database Node.
+        Properties that are missing (e.g. because only some fields have been selected) are set to None.
+
+        :param id: The id of the Node
+        :type id: int
+        :param properties: The properties of the Node
+        :type properties: Mapping
+
         :return: A new instance of a Competency
         :rtype: Competency
         """
         competency = Competency(
-            id=record["competency"].id,
-            skillType=record["competency"]._properties.get("skillType"),
-            conceptType=record["competency"]._properties.get("conceptType"),
-            conceptUri=record["competency"]._properties.get("conceptUri"),
-            reuseLevel=record["competency"]._properties.get("reuseLevel"),
-            preferredLabel=record["competency"]._properties.get(
-                "preferredLabel"
-            ),
-            altLabels=record["competency"]._properties.get("altLabels"),
-            hiddenLabels=record["competency"]._properties.get("hiddenLabels"),
-            status=record["competency"]._properties.get("status"),
-            modifiedDate=record["competency"]._properties.get("modifiedDate"),
-            scopeNote=record["competency"]._properties.get("scopeNote"),
-            definition=record["competency"]._properties.get("definition"),
-            inScheme=record["competency"]._properties.get("inScheme"),
-            description=record["competency"]._properties.get("description"),
+            id=id,
+            skillType=properties.get("skillType"),
+            conceptType=properties.get("conceptType"),
+            conceptUri=properties.get("conceptUri"),
+            reuseLevel=properties.get("reuseLevel"),
+            preferredLabel=properties.get("preferredLabel"),
+            altLabels=properties.get("altLabels"),
+            hiddenLabels=properties.get("hiddenLabels"),
+            status=properties.get("status"),
+            modifiedDate=properties.get("modifiedDate"),
+            scopeNote=properties.get("scopeNote"),
+            definition=properties.get("definition"),
+            inScheme=properties.get("inScheme"),
+            description=properties.get("description"),
         )
 
         return competency
 
-    def toJSON(self) -> Dict:
+    def toJSON(self, fields: List[str] = None) -> Dict:
         """
         Serializes an existing instance of a Competency into JSON format.
 
+        :param fields: Fields to serialize besides the id, all fields by default
+        :type fields: List[str]
+
         :return: A Competency serialized as JSON
         :rtype: Dict
         """
+        if fields is not None:
+            return {
+                "id": self.id,
+                **{field: getattr(self, field) for field in fields},
+            }
+
         return {
             "id": self.id,
             "skillType": self.skillType,
@@ -144,24 +201,69 @@ class Course:
         :param record: A Neo4J Database Record
         :type record: neo4j.Record
 
+        :return: A new instance of a Course
+        :rtype: Course
+        """
+        return Course.fromDatabaseNode(record["course"])
+
+    @staticmethod
+    def fromDatabaseNode(node: Node, competencies: List[Competency] = []):
+        """
+        Initializes a new instance of a Course using a Neo4J Database Node.
+
+        :param node: A Neo4J Database Node with the label Course
+        :type node: neo4j.graph.Node
+        :param competencies: The Competencies related to the Course
+        :type competencies: List[Competency]
+
         :return: A new instance of a Course
         :rtype: Course
         """
         course = Course(
-            id=record["course"].id,
-            description=record["course"]._properties["description"],
-            extractor=record["course"]._properties["extractor"],
+            id=node.id,
+            description=node._properties["description"],
+            extractor=node._properties["extractor"],
+            competencies=competencies,
         )
 
         return course
 
-    def toJSON(self) -> Dict:
+    @staticmethod
+    def fromDatabaseProperties(id: int, properties: Mapping):
+        """
+        Initializes a new instance of a Course using the id and the properties of a Neo4J Database Node.
+        Properties that are missing (e.g. because only some fields have been selected) are set to None.
+
+        :param id: The id of the Node
+        :type id: int
+        :param properties: The properties of the Node
+        :type properties: Mapping
+
+        :return: A new instance of a Course
+        :rtype: Course
+        """
+        return Course(
+            id=id,
+            description=properties.get("description"),
+            extractor=properties.get("extractor"),
+        )
+
+    def toJSON(self, fields: List[str] = None) -> Dict:
         """
         Serializes an existing instance of a Course into JSON format.
 
+        :param fields: Fields to serialize besides the id, all fields by default
+        :type fields: List[str]
+
         :return: A Course serialized as JSON
         :rtype: Dict
         """
+        if fields is not None:
+            return {
+                "id": self.id,
+                **{field: getattr(self, field) for field in fields},
+            }
+
         if self.competencies:
             competencies_json = [
                 competency.toJSON() for competency in self.competencies
@@ -0,0 +1,220 @@
+"""
+preprocessing_cache.py
+====================================
+Contains a cache for the results of the preprocessing pipeline, so that texts which have already been preprocessed
+(e.g. when importing the same Courses again or searching for the same text) do not have to be preprocessed again.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class PreprocessingCache:
+    """
+    A size-bounded cache of preprocessed texts, which evicts the least recently used texts first.
+    Optionally, the preprocessed texts are also stored in an SQLite File, so that they are kept across restarts
+    and shared between processes. Each process opens its own connection to the SQLite File, also when the cache
+    has been created before forking the process.
+
+    The texts are identified by a hash of the text and the version of the Preprocessor, so that results of a
+    different version (e.g. after changing the stopwords or the lexicon) are never returned.
+
+    :param version: Version of the Preprocessor the results belong to
+    :type version: str
+    :param max_size: Maximum number of preprocessed texts kept in memory
+    :type max_size: int
+    :param file_path: Path of the SQLite File, or None to only keep preprocessed texts in memory
+    :type file_path: str
+    :param max_file_size: Maximum number of preprocessed texts kept in the SQLite File
+    :type max_file_size: int
+    :ivar hits: Number of texts that have been found in the cache
+    :type hits: int
+    :ivar misses: Number of texts that have not been found in the cache
+    :type misses: int
+    """
+
+    def __init__(
+        self,
+        version: str,
+        max_size: int = 10000,
+        file_path: str = None,
+        max_file_size: int = 1000000,
+    ):
+        self.version = version
+        self.max_size = max_size
+        self.file_path = file_path
+        self.max_file_size = max_file_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Tuple[str, ...]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+        self._connection_pid = None
+
+        if file_path:
+            self._get_connection()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(self, text: str) -> str:
+        """
+        Get the key of a text. Newline characters are removed before hashing, as the preprocessing pipeline
+        does the same.
+
+        :param text: The text
+        :type text: str
+        :return: The key of the text
+        :rtype: str
+        """
+        return hashlib.sha256(
+            (self.version + "\0" + text.replace("\n", "")).encode("utf-8")
+        ).hexdigest()
+
+    def get_many(self, keys: List[str]) -> List[Optional[List[str]]]:
+        """
+        Get the preprocessed texts of the given keys.
+
+        :param keys: Keys of the texts
+        :type keys: List[str]
+        :return: For each key the preprocessed text, or None if it is not in the cache
+        :rtype: List[Optional[List[str]]]
+        """
+        results = {}
+
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    results[key] = self._entries[key]
+
+            missing_keys = [key for key in set(keys) if key not in results]
+            if self.file_path and len(missing_keys) > 0:
+                results.update(self._get_from_file(missing_keys))
+
+            found = [results.get(key) for key in keys]
+            self.hits += sum(1 for tokens in found if tokens is not None)
+            self.misses += sum(1 for tokens in found if tokens is None)
+
+        return [
+            list(tokens) if tokens is not None else None for tokens in found
+        ]
+
+    def set_many(self, entries: Iterable[Tuple[str, List[str]]]) -> None:
+        """
+        Add preprocessed texts to the cache.
+
+        :param entries: Pairs of the key of a text and the preprocessed text
+        :type entries: Iterable[Tuple[str, List[str]]]
+        """
+        entries = [(key, tuple(tokens)) for key, tokens in entries]
+
+        with self._lock:
+            self._set_in_memory(entries)
+
+            if self.file_path:
+                self._set_in_file(entries)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the counters of the cache.
+
+        :return: Number of hits, misses and preprocessed texts in memory
+        :rtype: Dict[str, int]
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+        }
+
+    def close(self) -> None:
+        """Closes the SQLite File."""
+        with self._lock:
+            if self._connection and self._connection_pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+
+    def _get_connection(self) -> sqlite3.Connection:
+        # a connection must not be used by a forked process
+        if self._connection is None or self._connection_pid != os.getpid():
+            self._connection = sqlite3.connect(
+                self.file_path, check_same_thread=False, timeout=30
+            )
+            self._connection_pid = os.getpid()
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS preprocessed_texts "
+                "(key TEXT PRIMARY KEY, tokens TEXT NOT NULL, used REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS preprocessed_texts_used "
+                "ON preprocessed_texts (used)"
+            )
+            self._connection.commit()
+
+        return self._connection
+
+    def _set_in_memory(self, entries: List[Tuple[str, Tuple[str, ...]]]):
+        if self.max_size <= 0:
+            return
+
+        for key, tokens in entries:
+            self._entries[key] = tokens
+            self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _get_from_file(self, keys: List[str]) -> Dict[str, Tuple[str, ...]]:
+        connection = self._get_connection()
+        results = {}
+
+        # stay below the maximum number of variables of an SQLite statement
+        for i in range(0, len(keys), 500):
+            chunk = keys[i : i + 500]
+            rows = connection.execute(
+                "SELECT key, tokens FROM preprocessed_texts WHERE key IN "
+                f"({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            results.update(
+                (key, tuple(json.loads(tokens))) for key, tokens in rows
+            )
+
+        if len(results) > 0:
+            connection.executemany(
+                "UPDATE preprocessed_texts SET used = ? WHERE key = ?",
+                [(time.time(), key) for key in results],
+            )
+            connection.commit()
+            self._set_in_memory(list(results.items()))
+
+        return results
+
+    def _set_in_file(self, entries: List[Tuple[str, Tuple[str, ...]]]):
+        connection = self._get_connection()
+        connection.executemany(
+            "INSERT OR REPLACE INTO preprocessed_texts (key, tokens, used) VALUES (?, ?, ?)",
+            [
+                (key, json.dumps(tokens, ensure_ascii=False), time.time())
+                for key, tokens in entries
+            ],
+        )
+
+        (size,) = connection.execute(
+            "SELECT COUNT(*) FROM preprocessed_texts"
+        ).fetchone()
+        if size > self.max_file_size:
+            connection.execute(
+                "DELETE FROM preprocessed_texts WHERE key IN "
+                "(SELECT key FROM preprocessed_texts ORDER BY used LIMIT ?)",
+                (size - self.max_file_size,),
+            )
+
+        connection.commit()
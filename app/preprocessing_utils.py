@@ -8,10 +8,23 @@ import string
 import pandas as pd
 import nltk
 import os
-from typing import List
-import numpy as np
-from itertools import groupby, zip_longest
+from typing import Dict, List, Mapping
+from functools import lru_cache
+from itertools import groupby, repeat, zip_longest
 import json
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from app.lexicon import Lexicon, read_morphys
+from app.preprocessing_cache import PreprocessingCache
+
+# increase when changing the preprocessing pipeline, so that cached results of the old pipeline are not used anymore
+PREPROCESSOR_VERSION = "1"
+
+
+# translation table to remove all punctuation characters except hyphens
+PUNCTUATION_TABLE = str.maketrans("", "", string.punctuation.replace("-", ""))
 
 
 def add_nltk_data_path():
@@ -35,22 +48,256 @@ def split_list_by_dot(list_with_dot: List[str]) -> List[List[str]]:
     ]
 
 
+class MorphysLemmatizer:
+    """
+    Lemmatizes tokens using the Morphys lookup table, which is either converted once into a dictionary mapping each
+    form to its lemma (see :meth:`from_dataframe`) or read from a compiled lexicon (see :class:`app.lexicon.Lexicon`).
+    If a form appears multiple times in the table, the first lemma is used.
+
+    :param lemmas: A mapping of forms to lemmas, forms without a lemma are mapped to None
+    :type lemmas: Mapping[str, str]
+    :param cache_size: Maximum number of lemmas of hyphenated compound words to keep in memory
+    :type cache_size: int
+    """
+
+    def __init__(self, lemmas: Mapping[str, str], cache_size: int = 100000):
+        self.lemmas = lemmas
+        self._lemmatize_compound = lru_cache(maxsize=cache_size)(
+            self._lemmatize_compound
+        )
+
+    @classmethod
+    def from_dataframe(cls, morphys: pd.DataFrame) -> "MorphysLemmatizer":
+        """
+        Create a lemmatizer from the Morphys lookup table (see :func:`app.lexicon.read_morphys`). Empty or missing
+        forms are skipped and empty or missing lemmas are mapped to None, like in the compiled lexicon.
+
+        :param morphys: The Morphys lookup table with the columns "form" and "lemma"
+        :type morphys: pd.DataFrame
+        :return: The lemmatizer
+        :rtype: MorphysLemmatizer
+        """
+        morphys = morphys[
+            ~morphys["form"].isna() & (morphys["form"] != "")
+        ].drop_duplicates(subset=["form"])
+        lemmas: Dict[str, str] = {
+            form: None if pd.isna(lemma) or lemma == "" else lemma
+            for form, lemma in zip(morphys["form"], morphys["lemma"])
+        }
+        return cls(lemmas)
+
+    def lemmatize(self, token: str) -> str:
+        """
+        Lemmatize a single token. Compound words that are written using hyphen notation and that do not appear in
+        the lookup table are lemmatized by joining the lemmas of their compounds with hyphens.
+        If a token does not appear in the lookup table, the token itself is used as the lemma.
+
+        :param token: The token
+        :type token: str
+        :return: The lemma of the token
+        :rtype: str
+        """
+        if token in self.lemmas:
+            return self.lemmas[token] or token
+
+        if "-" in token:
+            return self._lemmatize_compound(token)
+
+        return token
+
+    def _lemmatize_compound(self, token: str) -> str:
+        return "-".join(
+            [self.lemmas.get(part) or part for part in token.split("-")]
+        )
+
+
+_morphys_lemmatizer = None
+_morphys_lemmatizer_lock = threading.Lock()
+
+
+def get_morphys_lemmatizer() -> MorphysLemmatizer:
+    """
+    Get the Morphys lemmatizer shared by all Preprocessors of the process, which is loaded on first use.
+    If the environment variable "MORPHYS_LEXICON_FILE" is set, the compiled lexicon is memory mapped
+    (see :mod:`app.lexicon`), otherwise the CSV File set by the environment variable "MORPHYS_FILE" is read.
+
+    :return: The shared lemmatizer
+    :rtype: MorphysLemmatizer
+    """
+    global _morphys_lemmatizer
+
+    if _morphys_lemmatizer is None:
+        with _morphys_lemmatizer_lock:
+            if _morphys_lemmatizer is None:
+                if os.environ.get("MORPHYS_LEXICON_FILE"):
+                    _morphys_lemmatizer = MorphysLemmatizer(
+                        Lexicon(os.environ.get("MORPHYS_LEXICON_FILE"))
+                    )
+                else:
+                    _morphys_lemmatizer = MorphysLemmatizer.from_dataframe(
+                        read_morphys(os.environ.get("MORPHYS_FILE"))
+                    )
+
+    return _morphys_lemmatizer
+
+
+_preprocessing_pools: Dict[int, ProcessPoolExecutor] = {}
+_preprocessing_pools_pid = None
+_preprocessing_pools_lock = threading.Lock()
+
+
+def get_preprocessing_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Get the pool of processes shared by all Preprocessors of the process that preprocess texts with the given number
+    of workers. The pool is created on first use and its processes are kept, so that they load the lemmatizer only
+    once. The processes are started by a fork server (or spawned, where it is not available) instead of being forked
+    from the current process, which may hold locks of other threads. A forked process (e.g. a worker process of
+    gunicorn) creates its own pool.
+
+    :param workers: Number of processes of the pool
+    :type workers: int
+    :return: The shared pool
+    :rtype: concurrent.futures.ProcessPoolExecutor
+    """
+    global _preprocessing_pools_pid
+
+    with _preprocessing_pools_lock:
+        if _preprocessing_pools_pid != os.getpid():
+            # the pools of the parent process can't be used after a fork
+            _preprocessing_pools.clear()
+            _preprocessing_pools_pid = os.getpid()
+
+        executor = _preprocessing_pools.get(workers)
+        if executor is None:
+            context = multiprocessing.get_context(
+                "forkserver"
+                if "forkserver" in multiprocessing.get_all_start_methods()
+                else "spawn"
+            )
+            executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=context
+            )
+            _preprocessing_pools[workers] = executor
+
+        return executor
+
+
+def _discard_preprocessing_pool(
+    workers: int, executor: ProcessPoolExecutor
+) -> None:
+    with _preprocessing_pools_lock:
+        if _preprocessing_pools.get(workers) is executor:
+            del _preprocessing_pools[workers]
+
+    executor.shutdown(wait=False)
+
+
+def shutdown_preprocessing_pools() -> None:
+    """Shuts down the process pools of the current process."""
+    with _preprocessing_pools_lock:
+        if _preprocessing_pools_pid != os.getpid():
+            return
+
+        executors = list(_preprocessing_pools.values())
+        _preprocessing_pools.clear()
+
+    for executor in executors:
+        executor.shutdown()
+
+
+_preprocessing_cache = None
+_preprocessing_cache_lock = threading.Lock()
+
+
+def get_preprocessing_cache() -> PreprocessingCache:
+    """
+    Get the cache of preprocessed texts shared by all Preprocessors of the process, which is created on first use.
+    The environment variable "PREPROCESSING_CACHE_SIZE" sets the maximum number of preprocessed texts kept in memory
+    (defaults to 10000). If the environment variable "PREPROCESSING_CACHE_FILE" is set, the preprocessed texts are
+    also stored in that SQLite File, which keeps at most "PREPROCESSING_CACHE_FILE_SIZE" texts (defaults to 1000000).
+
+    The version of the cached results consists of :data:`PREPROCESSOR_VERSION` and the size and modification time
+    of the lexicon and the stopwords File.
+
+    :return: The shared cache, or None if caching is disabled (size 0 and no File)
+    :rtype: PreprocessingCache
+    """
+    global _preprocessing_cache
+
+    max_size = int(os.environ.get("PREPROCESSING_CACHE_SIZE", 10000))
+    file_path = os.environ.get("PREPROCESSING_CACHE_FILE")
+    if max_size <= 0 and not file_path:
+        return None
+
+    if _preprocessing_cache is None:
+        with _preprocessing_cache_lock:
+            if _preprocessing_cache is None:
+                version = [PREPROCESSOR_VERSION]
+                for data_file in (
+                    os.environ.get("MORPHYS_LEXICON_FILE")
+                    or os.environ.get("MORPHYS_FILE"),
+                    os.environ.get("STOPWORDS_FILE"),
+                ):
+                    stat = os.stat(data_file)
+                    version += [str(stat.st_size), str(stat.st_mtime_ns)]
+
+                _preprocessing_cache = PreprocessingCache(
+                    ":".join(version),
+                    max_size=max_size,
+                    file_path=file_path,
+                    max_file_size=int(
+                        os.environ.get(
+                            "PREPROCESSING_CACHE_FILE_SIZE", 1000000
+                        )
+                    ),
+                )
+
+    return _preprocessing_cache
+
+
 class PreprocessorGerman:
     """
     This class provides an interface for pre-processing course descriptions before parsing them into
     the entity recognition algorithm.
+
+    :param engine: Either "python" to preprocess the tokens of each text using plain lists, or "pandas" to use
+        the reference implementation based on Pandas Series. Both produce the same results.
+    :type engine: str
+    :param workers: Number of processes used to preprocess large batches of texts, defaults to the environment
+        variable "PREPROCESSING_WORKERS" or 1 (no additional processes)
+    :type workers: int
+    :param chunk_size: Number of texts each process preprocesses at a time, defaults to the environment variable
+        "PREPROCESSING_CHUNK_SIZE" or 500. Batches that are not larger than one chunk are preprocessed in the
+        current process.
+    :type chunk_size: int
+    :param use_cache: Whether to look up and store the preprocessed texts in the cache of the process
+        (see :func:`get_preprocessing_cache`)
+    :type use_cache: bool
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        engine: str = "python",
+        workers: int = None,
+        chunk_size: int = None,
+        use_cache: bool = True,
+    ):
         add_nltk_data_path()
-        self.morphys = pd.read_csv(
-            os.environ.get("MORPHYS_FILE"), encoding="utf-8", index_col=0
-        )[["form", "lemma"]]
+        self.lemmatizer = get_morphys_lemmatizer()
         self.language = "german"
+        self.engine = engine
+        self.workers = workers or int(
+            os.environ.get("PREPROCESSING_WORKERS", 1)
+        )
+        self.chunk_size = chunk_size or int(
+            os.environ.get("PREPROCESSING_CHUNK_SIZE", 500)
+        )
+        self.cache = get_preprocessing_cache() if use_cache else None
         with open(
             os.environ.get("STOPWORDS_FILE"), "r", encoding="utf-8"
         ) as f:
             self.stopwords = list(map(str.strip, list(f)))
+        self._stopwords_set = set(self.stopwords)
 
     @staticmethod
     def convert_to_series(texts: List[str]) -> pd.Series:
@@ -136,46 +383,20 @@ class PreprocessorGerman:
         into their compounds, then the lemma for each compound is searched in the table, and finally the lemmas of
         each compound are joined back together separated by hyphens.
         If a token does not appear in the lookup table, the token itself is used as the lemma.
+        The lookup is done by the :class:`MorphysLemmatizer` of the Preprocessor.
 
         :param texts: A Series of tokenized course descriptions
         :type texts: pd.Series[pd.Series[str]]
         :return: A Series of tokenized course descriptions where each token is lemmatized
         :rtype: pd.Series[pd.Series[str]]
         """
-        ## get slices to split concatenated series back into original series
-        indices_end = np.array(texts.map(len)).cumsum()
-        indices_start = np.insert(indices_end[:-1], obj=0, values=0)
-        slices = zip(indices_start, indices_end)
-
-        ## concatenate all course descriptions into one series
-        df = pd.concat(texts.tolist(), axis=0, ignore_index=True)
-
-        ## expand morphys by lemmas of compounds terms seperated by hyphens
-        df_hyphens = df[df.str.contains("-")]
-
-        df_lemma_hyphens = df_hyphens.map(
-            lambda x: "-".join(
-                [
-                    self.morphys[self.morphys["form"] == y]["lemma"].tolist()[
-                        0
-                    ]
-                    if y in self.morphys["form"].tolist()
-                    else y
-                    for y in x.split("-")
-                ]
+        return texts.map(
+            lambda x: pd.Series(
+                [self.lemmatizer.lemmatize(token) for token in x],
+                name="lemma",
+                dtype="str",
             )
-        ).rename("lemma")
-        morphys_exp = pd.concat(
-            [self.morphys, pd.concat([df_hyphens, df_lemma_hyphens], axis=1)]
-        ).drop_duplicates(subset=["form"])
-
-        ## lemmatize with expanded morphys dict
-        df = pd.merge(left=df, right=morphys_exp, how="left")
-
-        df = df["lemma"].fillna(df["form"])
-
-        ## split back into original series
-        return pd.Series([df.iloc[start:end] for start, end in slices])
+        )
 
     @staticmethod
     def lowercase(texts: pd.Series) -> pd.Series:
@@ -199,6 +420,138 @@ class PreprocessorGerman:
         - lemmatize using the morphys lemmatizer
         - lowercase each token
 
+        Texts that have already been preprocessed are taken from the cache. If more than one worker is configured
+        and the remaining batch is larger than one chunk, the texts are preprocessed in parallel
+        (see :meth:`preprocess_texts_parallel`).
+
+        :param texts: A list of texts
+        :type texts: List[str]
+        :return: The preprocessed texts
+        :rtype: List[List[str]]
+        """
+        if self.cache is None:
+            return self._preprocess_texts_uncached(texts)
+
+        texts = list(texts)
+        keys = [self.cache.key(text) for text in texts]
+        tokenized_texts = self.cache.get_many(keys)
+
+        # preprocess every text that is not cached only once
+        missing_texts = {}
+        for key, text, tokenized_text in zip(keys, texts, tokenized_texts):
+            if tokenized_text is None:
+                missing_texts.setdefault(key, text)
+
+        if len(missing_texts) == 0:
+            return tokenized_texts
+
+        preprocessed_texts = dict(
+            zip(
+                missing_texts,
+                self._preprocess_texts_uncached(list(missing_texts.values())),
+            )
+        )
+        self.cache.set_many(preprocessed_texts.items())
+
+        return [
+            tokenized_text
+            if tokenized_text is not None
+            else list(preprocessed_texts[key])
+            for key, tokenized_text in zip(keys, tokenized_texts)
+        ]
+
+    def _preprocess_texts_uncached(self, texts: List[str]) -> List[List[str]]:
+        if self.workers > 1 and len(texts) > self.chunk_size:
+            return self.preprocess_texts_parallel(texts)
+
+        return self._preprocess_texts(texts)
+
+    def _preprocess_texts(self, texts: List[str]) -> List[List[str]]:
+        if self.engine == "pandas":
+            return self.preprocess_texts_pandas(texts)
+
+        return self.preprocess_texts_python(texts)
+
+    def preprocess_texts_parallel(self, texts: List[str]) -> List[List[str]]:
+        """
+        Preprocesses a list of texts by splitting it into chunks, which are preprocessed by a pool of processes.
+        The pool is shared by all Preprocessors of the process (see :func:`get_preprocessing_pool`) and each of its
+        processes creates its own Preprocessor once. The results are returned in the order of the texts, so they are
+        the same as when preprocessing the texts in the current process.
+
+        :param texts: A list of texts
+        :type texts: List[str]
+        :return: The preprocessed texts
+        :rtype: List[List[str]]
+        """
+        texts = list(texts)
+        chunks = [
+            texts[i : i + self.chunk_size]
+            for i in range(0, len(texts), self.chunk_size)
+        ]
+
+        executor = get_preprocessing_pool(self.workers)
+        try:
+            results = executor.map(
+                _preprocess_texts_in_worker, repeat(self.engine), chunks
+            )
+            return [
+                tokenized_text
+                for tokenized_texts in results
+                for tokenized_text in tokenized_texts
+            ]
+        except BrokenProcessPool:
+            # a process of the pool died, so the next call creates a new pool
+            _discard_preprocessing_pool(self.workers, executor)
+            raise
+
+    def preprocess_texts_python(self, texts: List[str]) -> List[List[str]]:
+        """
+        Preprocesses a list of texts using the same pipeline as :meth:`preprocess_texts_pandas`, but works on plain
+        lists of tokens instead of Pandas Series.
+
+        :param texts: A list of texts
+        :type texts: List[str]
+        :return: The preprocessed texts
+        :rtype: List[List[str]]
+        """
+        # lemmatize and lowercase
+        return [
+            [
+                self.lemmatizer.lemmatize(token).lower()
+                for token in self._preprocess_tokens(text)
+            ]
+            for text in texts
+        ]
+
+    def _preprocess_tokens(self, text: str) -> List[str]:
+        """
+        Tokenizes a text and removes punctuation, numeric tokens and stopwords.
+        """
+        tokens = []
+
+        for token in nltk.word_tokenize(
+            text.replace("\n", ""), language=self.language
+        ):
+            # remove punctuation (but keep single dots)
+            if token != ".":
+                token = token.translate(PUNCTUATION_TABLE).strip("-")
+                if token == "":
+                    continue
+
+            # remove numeric tokens and stopwords
+            if token.isnumeric() or token.lower() in self._stopwords_set:
+                continue
+
+            tokens.append(token)
+
+        return tokens
+
+    def preprocess_texts_pandas(self, texts: List[str]) -> List[List[str]]:
+        """
+        Preprocesses a list of texts using Pandas Series (see :meth:`preprocess_texts`). This is the reference
+        implementation of the preprocessing pipeline.
+
         :param texts: A list of texts
         :type texts: List[str]
         :return: The preprocessed texts
@@ -311,3 +664,20 @@ class PreprocessorGerman:
         texts = pd.Series(texts)
         texts = texts.map(lambda x: " ".join(x).replace(" .", "."))
         return texts.tolist()
+
+
+# the Preprocessors of a process of the pool used by PreprocessorGerman.preprocess_texts_parallel, by engine
+_worker_preprocessors: Dict[str, "PreprocessorGerman"] = {}
+
+
+def _preprocess_texts_in_worker(
+    engine: str, texts: List[str]
+) -> List[List[str]]:
+    preprocessor = _worker_preprocessors.get(engine)
+    if preprocessor is None:
+        preprocessor = PreprocessorGerman(
+            engine=engine, workers=1, use_cache=False
+        )
+        _worker_preprocessors[engine] = preprocessor
+
+    return preprocessor._preprocess_texts(texts)
@@ -0,0 +1,265 @@
+"""
+response_cache.py
+====================================
+Contains a cache for the responses of read endpoints. The responses are kept until the data they were created from
+changes, and are sent with an ETag, so that clients polling the endpoints only receive the response again if it has
+changed.
+"""
+
+from typing import Callable, Dict, Optional, Tuple
+from collections import OrderedDict
+from flask import Response, current_app, request
+from werkzeug.datastructures import MultiDict
+import functools
+import hashlib
+import multiprocessing
+import threading
+
+
+class CachedResponse:
+    """
+    The body and the headers of a cached response.
+
+    :param body: Body of the response
+    :type body: bytes
+    :param mimetype: Mimetype of the response
+    :type mimetype: str
+    :param headers: Additional headers of the response (e.g. "X-Next-Cursor")
+    :type headers: Dict[str, str]
+    """
+
+    def __init__(self, body: bytes, mimetype: str, headers: Dict[str, str]):
+        self.body = body
+        self.mimetype = mimetype
+        self.headers = headers
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+
+    @staticmethod
+    def fromResponse(response: Response):
+        """
+        Initializes a new instance of a CachedResponse using a Flask Response.
+
+        :param response: A Flask Response
+        :type response: flask.Response
+
+        :return: A new instance of a CachedResponse
+        :rtype: CachedResponse
+        """
+        return CachedResponse(
+            response.get_data(),
+            response.mimetype,
+            {
+                name: value
+                for name, value in response.headers.items()
+                if name.startswith("X-")
+            },
+        )
+
+    def toResponse(self) -> Response:
+        """
+        Creates a Flask Response with the body and the headers of the cached response. The response is answered
+        with "304 Not Modified" if the ETag matches the "If-None-Match" header of the current request.
+
+        :return: The response
+        :rtype: flask.Response
+        """
+        response = Response(
+            self.body, mimetype=self.mimetype, headers=self.headers
+        )
+        response.set_etag(self.etag)
+        # clients may keep the response, but have to revalidate it before using it
+        response.cache_control.no_cache = True
+
+        return response.make_conditional(request)
+
+
+class ResponseCache:
+    """
+    A size-bounded cache of responses, which evicts the least recently used responses first.
+
+    Each response is stored together with the data version it was created from. Every write to the Database
+    increments the data version (see :meth:`invalidate`), so that older responses are never returned again.
+    The data version is kept in shared memory, so when the cache is created before forking the worker processes
+    (e.g. using the "--preload" option of gunicorn), a write handled by one worker process invalidates the responses
+    cached by all of them. Other processes can share the data version using :meth:`share_version`.
+
+    :param max_size: Maximum number of responses, 0 disables the cache
+    :type max_size: int
+    :param max_bytes: Maximum total size of the bodies of all responses
+    :type max_bytes: int
+    :ivar hits: Number of requests answered from the cache
+    :type hits: int
+    :ivar misses: Number of requests that have not been found in the cache
+    :type misses: int
+    """
+
+    def __init__(self, max_size: int = 128, max_bytes: int = 64 * 2**20):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Tuple, Tuple[int, CachedResponse]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # created in the spawn context, so that it can be passed to processes that are not forked (e.g. the processes
+        # of the JobManager, see share_version). Those import the Module while being started, before their
+        # finalizers are set up, so they use the default context, which does not leave a named semaphore behind.
+        inheriting = getattr(
+            multiprocessing.current_process(), "_inheriting", False
+        )
+        self._version = multiprocessing.get_context(
+            None if inheriting else "spawn"
+        ).Value("q", 0)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def version(self) -> int:
+        """The current data version"""
+        return self._version.value
+
+    @property
+    def shared_version(self) -> multiprocessing.Value:
+        """The data version in shared memory, which can be passed to a process when it is started"""
+        return self._version
+
+    def share_version(self, shared_version: multiprocessing.Value) -> None:
+        """
+        Use the data version of the ResponseCache of another process (see :attr:`shared_version`), e.g. in a process
+        that is not forked from it.
+
+        :param shared_version: The data version in shared memory
+        :type shared_version: multiprocessing.Value
+        """
+        self._version = shared_version
+
+    def invalidate(self) -> None:
+        """Increments the data version, so that all cached responses are created again."""
+        with self._version.get_lock():
+            self._version.value += 1
+
+    @staticmethod
+    def key(path: str, args: MultiDict) -> Tuple:
+        """
+        Get the key of a request. The query parameters are normalized, so that their order and empty parameters do
+        not matter.
+
+        :param path: Path of the request
+        :type path: str
+        :param args: Query parameters of the request
+        :type args: werkzeug.datastructures.MultiDict
+
+        :return: The key of the request
+        :rtype: Tuple
+        """
+        return (
+            path,
+            tuple(
+                sorted(
+                    (name, value) for name, value in args.items(True) if value
+                )
+            ),
+        )
+
+    def get(self, key: Tuple, version: int) -> Optional[CachedResponse]:
+        """
+        Get the cached response of a request.
+
+        :param key: Key of the request (see :meth:`key`)
+        :type key: Tuple
+        :param version: Data version the response must have been created from
+        :type version: int
+        :return: The cached response, or None if there is no response of the data version
+        :rtype: CachedResponse
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Tuple, version: int, response: CachedResponse) -> None:
+        """
+        Add the response of a request to the cache. Responses created from an older data version than the current
+        one are not added.
+
+        :param key: Key of the request (see :meth:`key`)
+        :type key: Tuple
+        :param version: Data version the response has been created from
+        :type version: int
+        :param response: The response
+        :type response: CachedResponse
+        """
+        if (
+            self.max_size <= 0
+            or len(response.body) > self.max_bytes
+            or version != self.version
+        ):
+            return
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (version, response)
+            self._bytes += len(response.body)
+
+            while (
+                len(self._entries) > self.max_size
+                or self._bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the counters of the cache.
+
+        :return: Number of hits, misses and cached responses and the current data version
+        :rtype: Dict[str, int]
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "version": self.version,
+        }
+
+    def _remove(self, key: Tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1].body)
+
+
+def cached(view: Callable) -> Callable:
+    """
+    Decorates a read endpoint, so that its successful responses are cached by the ResponseCache of the application
+    (``current_app.extensions["response_cache"]``) and sent with an ETag.
+
+    :param view: The endpoint
+    :type view: Callable
+    :return: The decorated endpoint
+    :rtype: Callable
+    """
+
+    @functools.wraps(view)
+    def cached_view(*args, **kwargs):
+        cache: ResponseCache = current_app.extensions["response_cache"]
+        key = cache.key(request.path, request.args)
+        # read the version before the Database, so that a response is never cached with a newer version
+        version = cache.version
+
+        cached_response = cache.get(key, version)
+        if cached_response is None:
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+            cached_response = CachedResponse.fromResponse(response)
+            cache.set(key, version, cached_response)
+
+        return cached_response.toResponse()
+
+    return cached_view
@@ -4,7 +4,17 @@ routes.py
 Defines the available Routes of the RESTful API.
 """
 
-from flask import Blueprint, Response, request, json, jsonify
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    request,
+    json,
+    jsonify,
+    stream_with_context,
+    url_for,
+)
 from app.db import (
     CourseAlreadyExists,
     GraphDatabaseConnection,
@@ -13,12 +23,26 @@ from app.db import (
     RetrievingCompetencyFailed,
 )
 from app.store import Store, StoreAlreadyInitialized
-from app.competency_extractor import (
-    MLCompetencyExtractor,
-    PaperCompetencyExtractor,
+from app.importer import (
+    CourseImportFailed,
+    CourseImportResult,
+    import_courses,
+    iterate_course_descriptions,
+)
+from app.exporter import EXPORT_FORMATS, serialize_courses, write_courses
+from app.extraction import (
+    ExtractionInputInvalid,
+    extract_courses,
+    iterate_json_descriptions,
+    iterate_ndjson_descriptions,
 )
-import xml.etree.ElementTree as ET
-from app.models import Course
+from app.jobs import Job
+from app.model_manager import model_manager
+from app.models import COMPETENCY_FIELDS, COURSE_FIELDS
+from app.response_cache import cached
+import itertools
+import os
+import tempfile
 
 routes = Blueprint("routes", __name__)
 
@@ -40,29 +64,76 @@ def initialize():
     :returns: Initialization result
     :rtype: str
     """
+    response_cache = current_app.extensions["response_cache"]
+
+    if _is_async_request():
+        job = current_app.extensions["jobs"].submit(
+            "initialize", _initialize_store_job
+        )
+        return _job_accepted(job)
+
+    def on_progress(inserted: int, total: int) -> None:
+        # the competencies of each batch are visible as soon as the batch has been inserted
+        response_cache.invalidate()
+        current_app.logger.info(
+            f"Inserted {inserted} of {total} competencies."
+        )
+
     store = Store()
     try:
-        store.initialize()
+        store.initialize(on_progress=on_progress)
         return "Database and Store have been initialized with Competencies successfully!"
     except StoreAlreadyInitialized:
         return "Database and Store have already been initialized.", 409
+    finally:
+        # competencies may have been inserted, also if the initialization failed
+        response_cache.invalidate()
 
 
-def _get_competency_extractor_from_string(name):
-    if name == "paper":
-        return PaperCompetencyExtractor()
-    elif name == "ml":
-        return MLCompetencyExtractor()
+def _initialize_store_job(job: Job) -> str:
+    # runs in a process of the JobManager, which shares the data version of the response cache
+    from app import response_cache
+
+    def on_progress(inserted: int, total: int) -> None:
+        # the competencies of each batch are visible as soon as the batch has been inserted
+        response_cache.invalidate()
+        job.update_progress(processed=inserted, total=total)
+
+    store = Store()
+    try:
+        store.initialize(on_progress=on_progress)
+    except StoreAlreadyInitialized:
+        raise StoreAlreadyInitialized(
+            "Database and Store have already been initialized."
+        )
+    finally:
+        response_cache.invalidate()
+
+    return "Database and Store have been initialized with Competencies successfully!"
 
-    return None
+
+def _is_async_request() -> bool:
+    return request.args.get("async", "").lower() == "true"
+
+
+def _job_accepted(job: Job):
+    return (
+        jsonify(job.toJSON()),
+        202,
+        {"Location": url_for("routes.retrieve_job", job_id=job.id)},
+    )
+
+
+def _get_competency_extractor_from_string(name):
+    return current_app.extensions["competency_extractors"].get(name)
 
 
 @routes.route("/courses", methods=["POST"])
 def create_course():
     """Create courses endpoint
 
-    :returns: Created Course response as JSON (or string if using XML Import)
-    :rtype: Union[flask.Response, str]
+    :returns: Created Course response as JSON (or the number of imported Courses and the conflicting Courses as JSON if using XML Import)
+    :rtype: flask.Response
     """
     extractor = request.args.get("extractor")
     if not extractor:
@@ -82,18 +153,17 @@ def create_course():
             [course_description]
         )[0]
 
-        db = GraphDatabaseConnection()
+        with GraphDatabaseConnection() as db:
+            try:
+                course = db.create_course(
+                    course_description, extractor, associated_competencies
+                )
+            except CourseAlreadyExists as e:
+                return {"error": str(e)}, 409
+            except CourseInsertionFailed as e:
+                return {"error": str(e)}, 400
 
-        try:
-            course = db.create_course(
-                course_description, extractor, associated_competencies
-            )
-        except CourseAlreadyExists as e:
-            return {"error": str(e)}, 409
-        except CourseInsertionFailed as e:
-            return {"error": str(e)}, 400
-
-        db.close()
+        current_app.extensions["response_cache"].invalidate()
 
         return jsonify(
             {
@@ -105,54 +175,239 @@ def create_course():
             }
         )
     elif request.headers.get("Content-Type").startswith("multipart/form-data"):
-        try:
-            course_descriptions = []
-            courses_file = request.files["courses"]
-
-            courses_xml = ET.parse(
-                courses_file.stream, parser=ET.XMLParser(encoding="utf-8")
-            )
-            courses = courses_xml.findall(".//COURSE")
-            for course in courses:
-                course_description = course.find("CS_DESC_LONG").text
-                course_descriptions += [course_description]
-
-        except:
+        courses_file = request.files.get("courses")
+        if not courses_file:
             return {
                 "error": "An error occured while reading the file. Please make sure to upload a correctly formatted XML file named as 'courses'."
             }, 400
 
-        if len(course_descriptions) > 0:
-            competencyExtractor = _get_competency_extractor_from_string(
-                name=extractor
-            )
-            db = GraphDatabaseConnection()
+        competencyExtractor = _get_competency_extractor_from_string(
+            name=extractor
+        )
 
-            associated_competencies = competencyExtractor.extract_competencies(
-                course_descriptions
+        response_cache = current_app.extensions["response_cache"]
+
+        if _is_async_request():
+            # the uploaded file is only available during the request, so it is kept in a temporary file for the job
+            with tempfile.NamedTemporaryFile(
+                suffix=".xml", delete=False
+            ) as upload:
+                courses_file.save(upload)
+
+            job = current_app.extensions["jobs"].submit(
+                "import-courses",
+                _import_courses_job,
+                args=(upload.name, extractor),
+                # also removes the file if the job is cancelled before it started
+                cleanup=lambda: os.remove(upload.name),
             )
+            return _job_accepted(job)
+
+        with GraphDatabaseConnection() as db:
+            try:
+                result = import_courses(
+                    iterate_course_descriptions(courses_file.stream),
+                    extractor,
+                    competencyExtractor,
+                    db,
+                    # the courses of each chunk are visible as soon as the chunk has been imported
+                    on_progress=lambda result: response_cache.invalidate(),
+                )
+            except CourseImportFailed as e:
+                return {
+                    "error": f"An error occured while reading the file. Please make sure to upload a correctly formatted XML file named as 'courses'. {e}"
+                }, 400
+            except CourseInsertionFailed as e:
+                return {"error": str(e)}, 400
+            finally:
+                # the courses are imported in batches, so some of them may have been imported before an error
+                response_cache.invalidate()
 
-            for i, course_description in enumerate(course_descriptions):
-                try:
-                    db.create_course(
-                        course_description,
-                        extractor,
-                        associated_competencies[i],
-                    )
-                except CourseAlreadyExists as e:
-                    return {"error": str(e)}, 409
-                except CourseInsertionFailed as e:
-                    return {"error": str(e)}, 400
-
-            db.close()
-            return "Imported Courses from XML File successfully!"
+        return jsonify(
+            {
+                "message": "Imported Courses from XML File successfully!",
+                **result.toJSON(),
+            }
+        )
     else:
         return {
             "error": "Content-Type not supported! Expected type application/json or multipart/form-data"
         }, 400
 
 
+def _import_courses_job(job: Job, file_path: str, extractor: str) -> Dict:
+    # runs in a process of the JobManager, which loads its own Competency Extractor and shares the data version of
+    # the response cache
+    from app import competency_extractors, response_cache
+
+    competencyExtractor = competency_extractors.get(extractor)
+
+    def on_progress(result: CourseImportResult) -> None:
+        # the courses of each chunk are visible as soon as the chunk has been imported
+        response_cache.invalidate()
+        job.update_progress(
+            processed=result.processed,
+            imported=result.imported,
+            competencies=result.competencies,
+            conflicts=result.conflict_count,
+        )
+
+    try:
+        with open(file_path, "rb") as courses_file:
+            with GraphDatabaseConnection() as db:
+                result = import_courses(
+                    iterate_course_descriptions(courses_file),
+                    extractor,
+                    competencyExtractor,
+                    db,
+                    on_progress=on_progress,
+                )
+    finally:
+        response_cache.invalidate()
+
+    return result.toJSON()
+
+
+@routes.route("/extract", methods=["POST"])
+def extract():
+    """Extract endpoint, which extracts competencies without storing the courses
+
+    :returns: For each course description the extracted competencies as newline delimited JSON
+    :rtype: flask.Response
+    """
+    extractor = request.args.get("extractor")
+    if not extractor:
+        extractor = "paper"
+
+    competencyExtractor = _get_competency_extractor_from_string(name=extractor)
+    if not competencyExtractor:
+        return {
+            "error": f"Competency Extractor '{extractor}' does not exist."
+        }, 400
+
+    if request.mimetype == "application/json":
+        try:
+            # the whole array has been received already, so all descriptions are checked before extracting any
+            course_descriptions = list(
+                iterate_json_descriptions(request.get_data())
+            )
+        except ExtractionInputInvalid as e:
+            return {"error": str(e)}, 400
+    elif request.mimetype == "application/x-ndjson":
+        # the lines are read while the results of the previous lines are sent
+        course_descriptions = iterate_ndjson_descriptions(request.stream)
+    else:
+        return {
+            "error": "Content-Type not supported! Expected type application/json or application/x-ndjson"
+        }, 400
+
+    results = extract_courses(course_descriptions, competencyExtractor)
+
+    return Response(
+        stream_with_context(_serialize_extraction_results(results)),
+        mimetype="application/x-ndjson",
+    )
+
+
+def _serialize_extraction_results(results: Iterable[Dict]) -> Iterator[str]:
+    try:
+        for result in results:
+            yield json.dumps(result) + "\n"
+    except ExtractionInputInvalid as e:
+        # the response has already been started, so the error is sent as the last line
+        yield json.dumps({"error": str(e)}) + "\n"
+    except Exception:
+        # e.g. the extractor failed on a later chunk, the response is still ended with the error as the last line
+        current_app.logger.exception("Extracting competencies failed.")
+        yield json.dumps(
+            {"error": "An error occured while extracting the competencies."}
+        ) + "\n"
+
+
+@routes.route("/jobs/<job_id>", methods=["GET"])
+def retrieve_job(job_id):
+    """Retrieve job endpoint
+
+    :returns: Status and progress of the job as JSON
+    :rtype: flask.Response
+    """
+    job = current_app.extensions["jobs"].get(job_id)
+    if not job:
+        return {"error": f"Job '{job_id}' does not exist."}, 404
+
+    return jsonify(job.toJSON())
+
+
+@routes.route("/models", methods=["GET"])
+def retrieve_models():
+    """Retrieve models endpoint
+
+    :returns: Load time and memory of the spaCy models loaded by this worker process as JSON
+    :rtype: flask.Response
+    """
+    return jsonify(model_manager.stats())
+
+
+def _get_page_arguments(
+    allowed_fields: Iterable[str],
+) -> Tuple[int, Optional[int], Optional[List[str]]]:
+    """Reads the "cursor", "limit" and "fields" query parameters of a request.
+
+    :raises ValueError: if one of the parameters is invalid
+    """
+    cursor = request.args.get("cursor")
+    limit = request.args.get("limit")
+    fields = request.args.get("fields")
+
+    try:
+        after_id = int(cursor) if cursor else -1
+    except ValueError:
+        raise ValueError(f"Cursor '{cursor}' is invalid.")
+
+    if limit:
+        if not limit.isdigit() or int(limit) < 1:
+            raise ValueError(
+                f"Limit '{limit}' is invalid. Expected a positive integer."
+            )
+        limit = int(limit)
+    else:
+        limit = None
+
+    if fields:
+        fields = [field.strip() for field in fields.split(",")]
+        fields = [field for field in fields if field and field != "id"]
+        for field in fields:
+            if field not in allowed_fields:
+                raise ValueError(
+                    f"Field '{field}' is not supported. Expected any of id, {', '.join(allowed_fields)}."
+                )
+    else:
+        fields = None
+
+    return (after_id, limit, fields)
+
+
+def _page_response(
+    items: List,
+    limit: Optional[int],
+    fields: Optional[List[str]],
+    next_cursor: int = None,
+):
+    """Serializes a page of courses or competencies. If the page is full, the cursor of the next page is returned
+    in the "X-Next-Cursor" header, which is the id of the last item unless another cursor is given."""
+    items = items or []
+    response = jsonify([item.toJSON(fields) for item in items])
+
+    if limit is not None and len(items) == limit:
+        response.headers["X-Next-Cursor"] = str(
+            items[-1].id if next_cursor is None else next_cursor
+        )
+
+    return response
+
+
 @routes.route("/courses", methods=["GET"])
+@cached
 def retrieve_courses():
     """Retrieve courses endpoint
 
@@ -162,25 +417,37 @@ def retrieve_courses():
     competency_id = request.args.get("competencyId")
     text_search_query = request.args.get("search")
 
-    db = GraphDatabaseConnection()
-
-    # in case the request body contains a competency_id, filter courses
     try:
-        if competency_id:
-            courses = db.find_courses_by_competency(int(competency_id))
-        elif text_search_query and len(text_search_query) > 0:
-            courses = db.find_courses_by_text_query(text_search_query)
-        else:
-            courses = db.retrieve_all_courses()
-    except RetrievingCourseFailed as e:
+        (after_id, limit, fields) = _get_page_arguments(COURSE_FIELDS)
+    except ValueError as e:
         return {"error": str(e)}, 400
 
-    db.close()
+    with GraphDatabaseConnection() as db:
+        # in case the request body contains a competency_id, filter courses
+        try:
+            if competency_id:
+                courses = db.find_courses_by_competency(
+                    int(competency_id), after_id, limit, fields
+                )
+            elif text_search_query and len(text_search_query) > 0:
+                # the courses are ranked by relevance, so the cursor is the number of courses already returned
+                offset = max(after_id, 0)
+                courses = db.find_courses_by_text_query(
+                    text_search_query, offset, limit, fields
+                )
+                return _page_response(
+                    courses, limit, fields, offset + len(courses or [])
+                )
+            else:
+                courses = db.retrieve_all_courses(after_id, limit, fields)
+        except RetrievingCourseFailed as e:
+            return {"error": str(e)}, 400
 
-    return jsonify([course.toJSON() for course in courses])
+    return _page_response(courses, limit, fields)
 
 
 @routes.route("/competencies", methods=["GET"])
+@cached
 def retrieve_competencies():
     """Retrieve competencies endpoint
 
@@ -190,66 +457,73 @@ def retrieve_competencies():
     course_id = request.args.get("courseId")
     text_search_query = request.args.get("search")
 
-    db = GraphDatabaseConnection()
-
     try:
-        if course_id:
-            competencies = db.find_competencies_by_course(int(course_id))
-        elif text_search_query and len(text_search_query) > 0:
-            competencies = db.find_competencies_by_text_query(
-                text_search_query
-            )
-        else:
-            competencies = db.retrieve_all_competencies()
-    except RetrievingCompetencyFailed as e:
+        (after_id, limit, fields) = _get_page_arguments(COMPETENCY_FIELDS)
+    except ValueError as e:
         return {"error": str(e)}, 400
 
-    db.close()
+    with GraphDatabaseConnection() as db:
+        try:
+            if course_id:
+                competencies = db.find_competencies_by_course(
+                    int(course_id), after_id, limit, fields
+                )
+            elif text_search_query and len(text_search_query) > 0:
+                competencies = db.find_competencies_by_text_query(
+                    text_search_query, after_id, limit, fields
+                )
+            else:
+                competencies = db.retrieve_all_competencies(
+                    after_id, limit, fields
+                )
+        except RetrievingCompetencyFailed as e:
+            return {"error": str(e)}, 400
 
-    return jsonify([competency.toJSON() for competency in competencies])
+    return _page_response(competencies, limit, fields)
 
 
 @routes.route("/courses/export", methods=["POST"])
 def export_courses():
     """Export endpoint
 
-    :returns: Export response
+    :returns: Export response, or the exported courses if the target is the response
     :rtype: str
     """
+    export_format = request.args.get("format", "json")
+    if export_format not in EXPORT_FORMATS:
+        return {
+            "error": f"Export format '{export_format}' is not supported. Expected one of {', '.join(EXPORT_FORMATS)}."
+        }, 400
 
-    file_path = "data/exported_courses.json"
-
-    f = open(file_path, "w")
-
-    db = GraphDatabaseConnection()
-
-    try:
-        courses = db.retrieve_all_courses()
-    except RetrievingCompetencyFailed as e:
-        return Response(f"error: {e}", status=400, mimetype="application/json")
-
-    db.close()
-
-    courses_with_competencies = []
+    with GraphDatabaseConnection() as db:
+        courses = db.iterate_courses_with_competencies()
 
-    for course in courses:
-        course_id = course.id
+        # fetch the first page right away, so that errors can still be returned as error response
         try:
-            competencies = db.find_competencies_by_course(course_id)
-        except RetrievingCompetencyFailed as e:
+            courses = itertools.chain([next(courses)], courses)
+        except StopIteration:
+            courses = iter([])
+        except RetrievingCourseFailed as e:
             return Response(
                 f"error: {e}", status=400, mimetype="application/json"
             )
-        courses_with_competencies.append(
-            Course(
-                course.id, course.description, course.extractor, competencies
+
+        if request.args.get("target") == "response":
+            # the response has already been started when a later page fails, so the error is sent as the last item
+            return Response(
+                serialize_courses(
+                    courses, export_format, errors=(RetrievingCourseFailed,)
+                ),
+                mimetype=EXPORT_FORMATS[export_format],
             )
-        )
 
-    json_string = json.dumps(
-        [course.toJSON() for course in courses_with_competencies]
-    )
+        file_path = f"data/exported_courses.{export_format}"
 
-    f.write(json_string)
+        try:
+            write_courses(courses, file_path, export_format)
+        except RetrievingCourseFailed as e:
+            return Response(
+                f"error: {e}", status=400, mimetype="application/json"
+            )
 
     return f"Database export was written into '{file_path}'."
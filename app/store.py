@@ -4,10 +4,12 @@ store.py
 Allows Initialization of the Database with Competencies and provides the termStore as well as the sequenceStore.
 """
 
-from typing import Union
+from typing import Callable, Optional, Union
 import os
+import threading
 from app.db import GraphDatabaseConnection
 import pandas
+from app.label_index import LabelIndex
 from app.preprocessing_utils import PreprocessorGerman
 from app.models import Competency, Label
 from typing import List
@@ -25,25 +27,46 @@ class Store:
     Furthermore, it also acts as the termStore and as the sequenceStore which are used by
     the :class:`app.competency_extractor.PaperCompetencyExtractor` class.
 
+    The term and sequence lookups are answered by a :class:`app.label_index.LabelIndex`, which is loaded once per
+    process from the Labels in the Database (see :attr:`label_index`) and shared by all instances of the Store. The Database is then only
+    queried to fetch the properties of the matching Competencies.
+
     :param language: Language to use (defaults to German)
     :type language: str
     :ivar preprocessor: An instance of the :class:`app.preprocessing_utils.PreprocessorGerman` class to preprocess the labels of Competencies
     :type preprocessor: PreprocessorGerman
     """
 
+    _label_index: LabelIndex = None
+    # the data version the index has been loaded with, None once the Store has been initialized
+    _label_index_version: Optional[int] = None
+    _label_index_lock = threading.Lock()
+    _get_data_version: Callable[[], int] = None
+
     def __init__(self, language="de"):
         self.db = GraphDatabaseConnection()
 
         if language == "de":
             self.preprocessor = PreprocessorGerman()
 
-    def initialize(self):
+    def close(self):
+        """Closes the Database Connection"""
+        self.db.close()
+
+    def initialize(self, on_progress: Callable[[int, int], None] = None):
         """
         Initializes the Database with Competencies imported from a EU-ESCO compatible .csv File.
-        The Location of the .csv file has to be specified using the environment variable "DATA_FILE"
+        The Location of the .csv file has to be specified using the environment variable "DATA_FILE".
+        The indexes and constraints of the Database are created beforehand, even if the Store has already been initialized.
+        If a previous initialization failed halfway, the missing competencies are inserted; the Store only counts as
+        initialized once all competencies have been inserted.
+
+        :param on_progress: Called after each inserted batch with the number of competencies inserted so far and the total number of competencies
+        :type on_progress: Callable[[int, int], None]
         """
-        existing_competencies = self.db.retrieve_all_competencies()
-        if existing_competencies and len(existing_competencies) > 0:
+        self.db.create_schema()
+
+        if self.db.is_store_initialized():
             raise StoreAlreadyInitialized()
 
         competencies = []
@@ -85,7 +108,65 @@ class Store:
 
             competencies += [competency]
 
-        self.db.create_competencies(competencies)
+        try:
+            self.db.create_competencies(competencies, on_progress=on_progress)
+        finally:
+            # the labels of the batches inserted so far are already used by the extractors
+            Store.reset_label_index()
+
+        self.db.set_store_initialized()
+
+    @property
+    def label_index(self) -> LabelIndex:
+        """
+        The process-wide index over all Labels in the Database. It is loaded on first access and kept for the
+        lifetime of the process once the Store has been initialized. Until then (e.g. while another process is
+        initializing the Store), the index is loaded again whenever the shared data version has changed
+        (see :meth:`track_data_version`), so that it never misses Labels inserted by another process.
+
+        :return: The index over all Labels mapping each label text to the ids of its Competencies
+        :rtype: LabelIndex
+        """
+        version = Store._get_data_version() if Store._get_data_version else 0
+
+        if not self._is_label_index_current(version):
+            with Store._label_index_lock:
+                if not self._is_label_index_current(version):
+                    # the marker is read before the Labels, so an index is only kept if it contains all Labels
+                    initialized = self.db.is_store_initialized()
+                    Store._label_index = LabelIndex(
+                        self.db.retrieve_all_labels()
+                    )
+                    Store._label_index_version = (
+                        None if initialized else version
+                    )
+
+        return Store._label_index
+
+    @staticmethod
+    def _is_label_index_current(version: int) -> bool:
+        return Store._label_index is not None and (
+            Store._label_index_version is None
+            or Store._label_index_version == version
+        )
+
+    @staticmethod
+    def track_data_version(get_data_version: Callable[[], int]) -> None:
+        """
+        Sets the data version shared by all processes, which is incremented after every write to the Database
+        (e.g. :attr:`app.response_cache.ResponseCache.version`). Without it, an index loaded before the Store has been
+        initialized is only discarded by :meth:`reset_label_index` of the same process.
+
+        :param get_data_version: Returns the current data version
+        :type get_data_version: Callable[[], int]
+        """
+        Store._get_data_version = get_data_version
+
+    @staticmethod
+    def reset_label_index():
+        """Discards the process-wide index over all Labels, so that it is loaded again on next access."""
+        with Store._label_index_lock:
+            Store._label_index = None
 
     def check_term(self, term: str) -> bool:
         """
@@ -96,8 +177,7 @@ class Store:
         :return: True if the term is contained in the term store and False if not
         :rtype: bool
         """
-        is_found = self.db.find_label_by_term(term)
-        return is_found
+        return self.label_index.contains_term(term)
 
     def check_sequence(
         self, sequence: Union[str, List[str]]
@@ -112,16 +192,54 @@ class Store:
         :return: A list of all competencies contained in the sequence store, whose labels match the given sequence.
         :rtype: List[Competency]
         """
-        if len(sequence) == 0:
-            return []
+        return self.check_sequences([sequence])[0]
 
-        if isinstance(sequence, str):
-            sequence_string = sequence
-        else:
-            sequence_string = " ".join(sequence)
+    def check_sequences(
+        self, sequences: List[Union[str, List[str]]]
+    ) -> List[List[Competency]]:
+        """
+        Check multiple sequences of words at once (see :meth:`check_sequence`). The Competencies of all sequences
+        are fetched from the Database using a single query.
 
-        competencies = self.db.find_competency_by_sequence(sequence_string)
-        return competencies
+        :param sequences: Sequences of words, each as a list of string tokens or as string
+        :type sequences: List[Union[str, List[str]]]
+
+        :return: For each sequence a list of all competencies whose labels match the sequence.
+        :rtype: List[List[Competency]]
+        """
+        competency_ids_by_sequence = [
+            self.label_index.find_sequence(
+                sequence if isinstance(sequence, str) else " ".join(sequence)
+            )
+            if len(sequence) > 0
+            else []
+            for sequence in sequences
+        ]
+
+        unique_competency_ids = {
+            competency_id
+            for competency_ids in competency_ids_by_sequence
+            for competency_id in competency_ids
+        }
+        if len(unique_competency_ids) == 0:
+            return [[] for _ in sequences]
+
+        competencies = {
+            competency.id: competency
+            for competency in self.db.find_competencies_by_ids(
+                list(unique_competency_ids)
+            )
+        }
+
+        # one competency per matching label, as when matching the labels in the Database
+        return [
+            [
+                competencies[competency_id]
+                for competency_id in competency_ids
+                if competency_id in competencies
+            ]
+            for competency_ids in competency_ids_by_sequence
+        ]
 
 
 class StoreLocal:
@@ -129,13 +247,21 @@ class StoreLocal:
     The StoreLocal class provides the same functionality as the Store class. The only difference is that the StoreLocal
     class can be used locally without having to start the server and without having to connect to the Database.
 
+    Both lookups are answered by a :class:`app.label_index.LabelIndex` over the labels, which is built when the
+    StoreLocal is created.
+
+    :param substring_terms: Whether :meth:`check_term` checks if a term appears anywhere inside a label text
+        (as the Store does) instead of checking if it is one of the tokens of a label text
+    :type substring_terms: bool
     :ivar preprocessor: An instance of the :class:`app.preprocessing_utils.PreprocessorGerman` class to preprocess the labels of Competencies
     :type preprocessor: PreprocessorGerman
     :ivar store_df: A DataFrame representation of a .csv file (located by the Environment Variable "LABELED_COMPETENCIES_FILE") which contains all preferred and alternative labels that are contained in the EU ESCO API.
     :type store_df: DataFrame
+    :ivar label_index: The index over all labels, mapping each label text to itself once per row of the .csv file
+    :type label_index: LabelIndex
     """
 
-    def __init__(self) -> None:
+    def __init__(self, substring_terms: bool = False) -> None:
         """
         Constructor method
         """
@@ -144,20 +270,33 @@ class StoreLocal:
             os.environ.get("LABELED_COMPETENCIES_FILE"),
             index_col=0,
         )
+        self.substring_terms = substring_terms
+        self.label_index = LabelIndex(
+            (label, label) for label in self.store_df["label"].dropna()
+        )
+
+    def close(self) -> None:
+        """The local Store does not hold a Database Connection, so there is nothing to close."""
+        pass
 
     def check_term(self, term: str) -> bool:
         """
         Check if a term is contained in the term store.
 
+        By default, the term has to be one of the tokens of a label. A term that only appears inside a token of a
+        label can never be part of a sequence that matches a label, so the Paper Algorithm finds the same
+        competencies as when checking whether the term appears anywhere inside a label. Terms containing spaces are
+        always checked that way.
+
         :param term: A single term
         :type term: str
         :return: True if the term is contained in the term store and False if not
         :rtype: bool
         """
-        return (
-            self.store_df[self.store_df["label"].str.contains(term)].shape[0]
-            > 0
-        )
+        if self.substring_terms or len(term) == 0 or " " in term:
+            return self.label_index.contains_term(term)
+
+        return self.label_index.contains_token(term)
 
     def check_sequence(self, sequence: List[str]) -> List[str]:
         """
@@ -172,6 +311,17 @@ class StoreLocal:
         """
         if len(sequence) == 0:
             return []
-        sequence_string = " ".join(sequence)
-        competencies = self.store_df[self.store_df["label"] == sequence_string]
-        return competencies["label"].tolist()
+
+        return list(self.label_index.find_sequence(" ".join(sequence)))
+
+    def check_sequences(self, sequences: List[List[str]]) -> List[List[str]]:
+        """
+        Check multiple sequences at once (see :meth:`check_sequence`).
+
+        :param sequences: Sequences of words, each as a list of string tokens
+        :type sequences: List[List[str]]
+
+        :return: For each sequence a list of all competencies whose labels match the sequence.
+        :rtype: List[List[str]]
+        """
+        return [self.check_sequence(sequence) for sequence in sequences]
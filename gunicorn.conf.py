@@ -0,0 +1,13 @@
+"""
+Configuration of gunicorn, which is loaded automatically when gunicorn is started in the root folder.
+"""
+
+# load the application in the master process, so that the forked worker processes share the loaded models
+preload_app = True
+
+
+def on_starting(server):
+    # runs in the master process before the worker processes are forked
+    from app import startup
+
+    startup()
@@ -0,0 +1,157 @@
+from app.db import (
+    COURSE_FULLTEXT_INDEX_QUERY,
+    GraphDatabaseConnection,
+    _fulltext_query,
+    description_hash,
+)
+from app.models import Competency
+from types import SimpleNamespace
+import contextlib
+
+
+def test_fulltext_query_matches_all_words():
+    assert _fulltext_query("Musik  Verwaltung") == "musik AND verwaltung"
+    assert _fulltext_query("   ") == ""
+
+
+def test_fulltext_query_escapes_lucene_syntax():
+    assert (
+        _fulltext_query('C++ OR "Java" (Grundlagen) a:b')
+        == 'c\\+\\+ AND or AND \\"java\\" AND \\(grundlagen\\) AND a\\:b'
+    )
+
+
+def test_description_hash_of_long_descriptions():
+    description = "Kurs " * 10000
+
+    assert len(description_hash(description)) == 64
+    assert description_hash(description) == description_hash("Kurs " * 10000)
+    assert description_hash(description) != description_hash("Kurs")
+
+
+class Result(list):
+    def consume(self):
+        pass
+
+
+class CoursesTransaction:
+    """Answers the queries of GraphDatabaseConnection._create_courses_transaction from memory"""
+
+    def __init__(self, existing_courses):
+        self.courses = {
+            (description_hash(description), extractor): description
+            for description, extractor in existing_courses
+        }
+        self.created = []
+        self.relations = []
+
+    def run(self, query, courses=None, relations=None):
+        if "RETURN DISTINCT course.index" in query:
+            return Result(
+                {"index": course["index"]}
+                for course in courses
+                if self.courses.get(
+                    (course["descriptionHash"], course["extractor"])
+                )
+                == course["description"]
+            )
+        if "CREATE (c:Course)" in query:
+            self.created.append(courses)
+            for course in courses:
+                self.courses[
+                    (course["descriptionHash"], course["extractor"])
+                ] = course["description"]
+            return Result(
+                {"index": course["index"], "id": 100 + course["index"]}
+                for course in courses
+            )
+
+        self.relations += relations
+        return Result()
+
+
+class CoursesDatabase(GraphDatabaseConnection):
+    def __init__(self, transaction):
+        self.transaction = transaction
+
+    def _write_transaction(self, transaction_function, *args):
+        return transaction_function(self.transaction, *args)
+
+
+def test_create_courses_reports_existing_and_repeated_courses():
+    competency = Competency.fromDatabaseProperties(7, {})
+    transaction = CoursesTransaction([("Musik", "paper")])
+
+    (courses, conflicts) = CoursesDatabase(transaction).create_courses(
+        [
+            ("Musik", "paper", [competency]),
+            ("Musik", "ml", [competency, competency]),
+            ("Strafvollzug", "paper", []),
+            ("Musik", "ml", [competency]),
+            ("Strafvollzug", "paper", []),
+        ],
+        batch_size=2,
+    )
+
+    assert conflicts == [0, 3, 4]
+    assert [
+        (course.id, course.description, course.extractor) for course in courses
+    ] == [
+        (101, "Musik", "ml"),
+        (102, "Strafvollzug", "paper"),
+    ]
+    # the courses are inserted in batches and repeated courses are not sent again
+    assert [
+        [course["index"] for course in batch] for batch in transaction.created
+    ] == [
+        [1],
+        [2],
+    ]
+    assert transaction.created[0][0]["descriptionHash"] == description_hash(
+        "Musik"
+    )
+    assert transaction.relations == [{"courseId": 101, "competencyId": 7}]
+
+
+class SearchDatabase(GraphDatabaseConnection):
+    """Answers the state of the fulltext index and records the search queries"""
+
+    def __init__(self, state):
+        self.state = state
+        self.created = []
+        self.searches = []
+
+    @property
+    def driver(self):
+        return self
+
+    def session(self, **kwargs):
+        return contextlib.nullcontext(self)
+
+    def run(self, query):
+        self.created.append(query)
+        self.state = "POPULATING"
+        return SimpleNamespace(consume=lambda: None)
+
+    def _read_transaction(self, transaction_function, *args):
+        if transaction_function == self._get_index_state:
+            return self.state
+
+        self.searches.append(transaction_function.__name__)
+        return []
+
+
+def test_search_courses_without_fulltext_index(monkeypatch):
+    monkeypatch.setattr("app.db._course_fulltext_index_online", False)
+    db = SearchDatabase(state=None)
+
+    # the missing index is created, and the descriptions are searched without it until it is online
+    db.find_courses_by_text_query("Musik")
+    db.find_courses_by_text_query("Musik")
+    assert db.created == [COURSE_FULLTEXT_INDEX_QUERY]
+    assert db.searches == ["_find_courses_by_text_contained"] * 2
+
+    db.state = "ONLINE"
+    db.find_courses_by_text_query("Musik")
+    db.find_courses_by_text_query("Musik")
+    assert db.searches[2:] == ["_find_courses_by_text_query"] * 2
@@ -0,0 +1,69 @@
+from app.exporter import (
+    ExportFormatNotSupported,
+    serialize_courses,
+    write_courses,
+)
+from app.models import Course
+import json
+import pytest
+
+courses = [
+    Course(1, "Musikpersonal verwalten", "paper"),
+    Course(2, "Strafvollzugsverfahren beaufsichtigen", "ml"),
+]
+
+
+def test_serialize_courses_json():
+    result = "".join(serialize_courses(courses, "json"))
+    assert json.loads(result) == [course.toJSON() for course in courses]
+    assert "".join(serialize_courses([], "json")) == "[]"
+
+
+def test_serialize_courses_ndjson():
+    result = "".join(serialize_courses(courses, "ndjson"))
+    assert [json.loads(line) for line in result.splitlines()] == [
+        course.toJSON() for course in courses
+    ]
+
+
+def test_write_courses_format_not_supported(tmp_path):
+    with pytest.raises(ExportFormatNotSupported):
+        write_courses(courses, str(tmp_path / "courses.xml"), "xml")
+
+    assert not (tmp_path / "courses.xml").exists()
+
+
+class ExportFailed(Exception):
+    pass
+
+
+def iterate_failing_courses():
+    yield courses[0]
+    raise ExportFailed("Retrieving the second page failed")
+
+
+def test_serialize_courses_json_error():
+    result = "".join(
+        serialize_courses(
+            iterate_failing_courses(), "json", errors=(ExportFailed,)
+        )
+    )
+    assert json.loads(result) == [
+        courses[0].toJSON(),
+        {"error": "Retrieving the second page failed"},
+    ]
+
+
+def test_serialize_courses_ndjson_error():
+    result = "".join(
+        serialize_courses(
+            iterate_failing_courses(), "ndjson", errors=(ExportFailed,)
+        )
+    )
+    assert [json.loads(line) for line in result.splitlines()] == [
+        courses[0].toJSON(),
+        {"error": "Retrieving the second page failed"},
+    ]
+
+    with pytest.raises(ExportFailed):
+        "".join(serialize_courses(iterate_failing_courses(), "ndjson"))
@@ -0,0 +1,93 @@
+from app.competency_extractor import CompetencyExtractorInterface
+from app.extraction import (
+    ExtractionInputInvalid,
+    extract_courses,
+    iterate_json_descriptions,
+    iterate_ndjson_descriptions,
+)
+from app.models import Competency
+import json
+import pytest
+
+
+class LabelCompetencyExtractor(CompetencyExtractorInterface):
+    """Extracts one Competency labelled with the description from each description"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def extract_competencies(self, course_descriptions):
+        self.chunks.append(course_descriptions)
+        return [
+            [Competency.fromDatabaseProperties(1, {"preferredLabel": text})]
+            for text in course_descriptions
+        ]
+
+
+def test_iterate_json_descriptions():
+    assert list(
+        iterate_json_descriptions(
+            '["Musik", {"courseDescription": "Strafvollzug"}]'
+        )
+    ) == ["Musik", "Strafvollzug"]
+
+    with pytest.raises(ExtractionInputInvalid):
+        list(iterate_json_descriptions('{"courseDescription": "Musik"}'))
+    with pytest.raises(ExtractionInputInvalid):
+        list(iterate_json_descriptions('["Musik", {"description": "x"}]'))
+
+
+def test_iterate_ndjson_descriptions():
+    lines = [b'"Musik"\n', b"\n", b'{"courseDescription": "Strafvollzug"}\n']
+    assert list(iterate_ndjson_descriptions(lines)) == [
+        "Musik",
+        "Strafvollzug",
+    ]
+
+    with pytest.raises(ExtractionInputInvalid):
+        list(iterate_ndjson_descriptions([b'"Musik"\n', b"Strafvollzug\n"]))
+
+
+def test_extract_courses_in_chunks():
+    extractor = LabelCompetencyExtractor()
+
+    results = list(extract_courses(["a", "b", "c"], extractor, chunk_size=2))
+
+    assert extractor.chunks == [["a", "b"], ["c"]]
+    assert [result["index"] for result in results] == [0, 1, 2]
+    assert [
+        result["competencies"][0]["preferredLabel"] for result in results
+    ] == ["a", "b", "c"]
+
+
+class FailingCompetencyExtractor(LabelCompetencyExtractor):
+    """Fails to extract the Competencies of the second chunk"""
+
+    def extract_competencies(self, course_descriptions):
+        if len(self.chunks) == 1:
+            raise RuntimeError("Extractor failed")
+
+        return super().extract_competencies(course_descriptions)
+
+
+def test_extract_endpoint_ends_with_error_of_failing_extractor(monkeypatch):
+    from app import app
+
+    monkeypatch.setenv("EXTRACT_CHUNK_SIZE", "1")
+    monkeypatch.setattr(
+        app.extensions["competency_extractors"],
+        "get",
+        lambda name: FailingCompetencyExtractor(),
+    )
+
+    response = app.test_client().post(
+        "/extract", json=["Musik", "Strafvollzug", "Kurse"]
+    )
+
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.get_data().splitlines()]
+    assert len(lines) == 2
+    assert lines[0]["index"] == 0
+    assert lines[1] == {
+        "error": "An error occured while extracting the competencies."
+    }
@@ -0,0 +1,154 @@
+from app.importer import (
+    CONFLICT_DESCRIPTION_LENGTH,
+    CourseImportFailed,
+    import_courses,
+    iterate_course_descriptions,
+)
+from app.competency_extractor import CompetencyExtractorInterface
+from app.models import Competency
+import io
+import pytest
+import xml.etree.ElementTree as ET
+
+
+def courses_xml(descriptions, end="</COURSES>"):
+    courses = "".join(
+        f"<COURSE><CS_TITLE>Kurs {i}</CS_TITLE><CS_DESC_LONG>{description}</CS_DESC_LONG></COURSE>"
+        for i, description in enumerate(descriptions)
+    )
+    return io.BytesIO(
+        f'<?xml version="1.0" encoding="utf-8"?><COURSES>{courses}{end}'.encode(
+            "utf-8"
+        )
+    )
+
+
+class CountingCompetencyExtractor(CompetencyExtractorInterface):
+    """Extracts one Competency per description and records the chunks"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def extract_competencies(self, course_descriptions):
+        self.chunks.append(list(course_descriptions))
+        return [
+            [Competency.fromDatabaseProperties(1, {})]
+            for _ in course_descriptions
+        ]
+
+
+class CoursesDatabase:
+    """Records the inserted chunks and reports the given descriptions as conflicts"""
+
+    def __init__(self, existing_descriptions=()):
+        self.existing_descriptions = set(existing_descriptions)
+        self.chunks = []
+
+    def create_courses(self, courses):
+        self.chunks.append([description for description, _, _ in courses])
+        conflicts = [
+            i
+            for i, (description, _, _) in enumerate(courses)
+            if description in self.existing_descriptions
+        ]
+        return (
+            [course for i, course in enumerate(courses) if i not in conflicts],
+            conflicts,
+        )
+
+
+def test_import_courses_in_chunks():
+    descriptions = [f"Beschreibung {i}" for i in range(7)]
+    extractor = CountingCompetencyExtractor()
+    db = CoursesDatabase(existing_descriptions=["Beschreibung 4"])
+    progress = []
+
+    result = import_courses(
+        iterate_course_descriptions(courses_xml(descriptions)),
+        "paper",
+        extractor,
+        db,
+        chunk_size=3,
+        on_progress=lambda result: progress.append(result.processed),
+    )
+
+    assert extractor.chunks == [
+        descriptions[0:3],
+        descriptions[3:6],
+        descriptions[6:7],
+    ]
+    assert db.chunks == extractor.chunks
+    assert progress == [3, 6, 7]
+    assert result.toJSON() == {
+        "processed": 7,
+        "imported": 6,
+        "competencies": 6,
+        "conflictCount": 1,
+        "conflicts": [{"index": 4, "description": "Beschreibung 4"}],
+    }
+
+
+def test_import_courses_caps_conflicts(monkeypatch):
+    monkeypatch.setenv("IMPORT_MAX_CONFLICTS", "2")
+    descriptions = [f"Beschreibung {i} " + "x" * 200 for i in range(5)]
+
+    result = import_courses(
+        iterate_course_descriptions(courses_xml(descriptions)),
+        "paper",
+        CountingCompetencyExtractor(),
+        CoursesDatabase(existing_descriptions=descriptions),
+        chunk_size=3,
+    )
+
+    assert result.toJSON()["conflictCount"] == 5
+    assert [
+        conflict["index"] for conflict in result.toJSON()["conflicts"]
+    ] == [0, 1]
+    assert result.toJSON()["conflicts"][0]["description"] == (
+        descriptions[0][:CONFLICT_DESCRIPTION_LENGTH] + "..."
+    )
+
+
+def test_import_courses_malformed_xml_keeps_previous_chunks():
+    descriptions = [f"Beschreibung {i}" for i in range(5)]
+    db = CoursesDatabase()
+
+    with pytest.raises(CourseImportFailed):
+        import_courses(
+            iterate_course_descriptions(
+                courses_xml(descriptions, end="<COURSE><CS_DESC_LONG>")
+            ),
+            "paper",
+            CountingCompetencyExtractor(),
+            db,
+            chunk_size=2,
+        )
+
+    assert db.chunks == [descriptions[0:2], descriptions[2:4]]
+
+
+def test_iterate_course_descriptions_clears_parsed_courses(monkeypatch):
+    elements = []
+    iterparse = ET.iterparse
+
+    def recording_iterparse(*args, **kwargs):
+        for event, element in iterparse(*args, **kwargs):
+            elements.append(element)
+            yield (event, element)
+
+    monkeypatch.setattr(ET, "iterparse", recording_iterparse)
+    descriptions = [f"Beschreibung {i}" for i in range(5)]
+
+    # courses without a description are skipped
+    result = list(
+        iterate_course_descriptions(
+            courses_xml(descriptions[:2] + [""] + descriptions[2:])
+        )
+    )
+
+    assert result == descriptions
+    root = next(element for element in elements if element.tag == "COURSES")
+    assert len(root) == 0
+    assert all(
+        len(element) == 0 for element in elements if element.tag == "COURSE"
+    )
@@ -0,0 +1,184 @@
+import os
+import threading
+import time
+from app.jobs import JobManager
+
+
+def _wait_for(job_manager, job, statuses=("queued", "running"), timeout=60):
+    deadline = time.time() + timeout
+    while job_manager.get(job.id).status in statuses:
+        assert (
+            time.time() < deadline
+        ), f"Job is still {job_manager.get(job.id).status}"
+        time.sleep(0.05)
+
+    return job_manager.get(job.id)
+
+
+def finishing_task(job, result):
+    job.update_progress(processed=2)
+    return result
+
+
+def failing_task(job):
+    raise ValueError("failed")
+
+
+def blocking_task(job, release_file):
+    # the tasks run in other processes, so they are released by creating a file
+    while not os.path.exists(release_file):
+        time.sleep(0.05)
+
+
+def test_job_finished(tmp_path):
+    job_manager = JobManager(
+        max_workers=1, file_path=str(tmp_path / "jobs.sqlite")
+    )
+    job = job_manager.submit("test", finishing_task, args=("result",))
+    job = _wait_for(job_manager, job)
+    job_manager.shutdown()
+
+    assert job.status == "finished"
+    assert job.result == "result"
+    assert job.toJSON()["progress"]["processed"] == 2
+    assert "throughput" in job.toJSON()["progress"]
+
+
+def test_job_visible_to_other_processes(tmp_path):
+    job_manager = JobManager(
+        max_workers=1, file_path=str(tmp_path / "jobs.sqlite")
+    )
+    job = job_manager.submit("test", finishing_task, args=("result",))
+    _wait_for(job_manager, job)
+    job_manager.shutdown()
+
+    # e.g. another worker process of gunicorn
+    other_job_manager = JobManager(file_path=str(tmp_path / "jobs.sqlite"))
+    assert (
+        other_job_manager.get(job.id).toJSON()
+        == job_manager.get(job.id).toJSON()
+    )
+
+
+def test_job_failed(tmp_path):
+    job_manager = JobManager(
+        max_workers=1, file_path=str(tmp_path / "jobs.sqlite")
+    )
+    job = job_manager.submit("test", failing_task)
+    job = _wait_for(job_manager, job)
+    job_manager.shutdown()
+
+    assert job.status == "failed"
+    assert job.error == "failed"
+
+
+def test_job_task_not_picklable(tmp_path):
+    job_manager = JobManager(
+        max_workers=1, file_path=str(tmp_path / "jobs.sqlite")
+    )
+    job = job_manager.submit("test", lambda job: "result")
+    job = _wait_for(job_manager, job)
+    job_manager.shutdown()
+
+    assert job.status == "failed"
+
+
+def test_job_non_existing(tmp_path):
+    job_manager = JobManager(
+        max_workers=1, file_path=str(tmp_path / "jobs.sqlite")
+    )
+    assert job_manager.get("nichtexistierendejob") is None
+
+
+def test_job_cleanup(tmp_path):
+    cleaned_up = []
+
+    job_manager = JobManager(
+        max_workers=1, file_path=str(tmp_path / "jobs.sqlite")
+    )
+    job = job_manager.submit(
+        "test",
+        finishing_task,
+        args=("result",),
+        cleanup=lambda: cleaned_up.append(1),
+    )
+    job = _wait_for(job_manager, job)
+    job_manager.shutdown()
+
+    assert job.status == "finished"
+    assert cleaned_up == [1]
+
+
+def test_job_cancelled_on_shutdown_is_cleaned_up(tmp_path):
+    release_file = str(tmp_path / "release")
+    cleaned_up = []
+
+    job_manager = JobManager(
+        max_workers=1, file_path=str(tmp_path / "jobs.sqlite")
+    )
+    running_job = job_manager.submit(
+        "running", blocking_task, args=(release_file,)
+    )
+    _wait_for(job_manager, running_job, statuses=("queued",))
+    queued_jobs = [
+        job_manager.submit(
+            "queued",
+            finishing_task,
+            args=(i,),
+            cleanup=lambda i=i: cleaned_up.append(i),
+        )
+        for i in range(4)
+    ]
+
+    # shutdown cancels the jobs that have not been sent to a process yet and then waits for the other jobs
+    shutdown = threading.Thread(target=job_manager.shutdown)
+    shutdown.start()
+    deadline = time.time() + 60
+    while job_manager.get(queued_jobs[-1].id).status != "cancelled":
+        assert time.time() < deadline
+        time.sleep(0.05)
+    open(release_file, "w").close()
+    shutdown.join(60)
+
+    statuses = [job_manager.get(job.id).status for job in queued_jobs]
+    assert job_manager.get(running_job.id).status == "finished"
+    assert set(statuses) == {"finished", "cancelled"}
+    assert sorted(cleaned_up) == [0, 1, 2, 3]
+
+
+def test_job_discards_oldest_finished_jobs(tmp_path):
+    job_manager = JobManager(
+        max_workers=1, max_jobs=2, file_path=str(tmp_path / "jobs.sqlite")
+    )
+    jobs = []
+    for i in range(3):
+        jobs.append(job_manager.submit("test", finishing_task, args=(i,)))
+        _wait_for(job_manager, jobs[-1])
+    job_manager.shutdown()
+
+    assert job_manager.get(jobs[0].id) is None
+    assert [job_manager.get(job.id).result for job in jobs[1:]] == [1, 2]
+
+
+def invalidating_task(job):
+    from app import response_cache
+
+    response_cache.invalidate()
+
+
+def test_job_invalidates_cached_responses_of_worker_process(tmp_path):
+    from app import _init_job_process, response_cache
+
+    version = response_cache.version
+    job_manager = JobManager(
+        max_workers=1,
+        file_path=str(tmp_path / "jobs.sqlite"),
+        initializer=_init_job_process,
+        initargs=(response_cache.shared_version,),
+    )
+    job = job_manager.submit("test", invalidating_task)
+    job = _wait_for(job_manager, job)
+    job_manager.shutdown()
+
+    assert job.status == "finished"
+    assert response_cache.version == version + 1
@@ -0,0 +1,66 @@
+from app.label_index import LabelIndex, SubstringIndex
+
+
+def _create_label_index():
+    return LabelIndex(
+        [
+            ("musikpersonal verwalten", 1),
+            ("strafvollzugsverfahren beaufsichtigen", 2),
+            ("musikpersonal verwalten", 3),
+        ]
+    )
+
+
+def test_label_index_contains_term_existing():
+    label_index = _create_label_index()
+    assert label_index.contains_term("personal") == True
+    assert label_index.contains_term("verwalten") == True
+
+
+def test_label_index_contains_term_non_existing():
+    label_index = _create_label_index()
+    assert label_index.contains_term("nichtexistierendeswort") == False
+    assert label_index.contains_term("verwalten\nstrafvollzug") == False
+
+
+def test_label_index_empty():
+    label_index = LabelIndex([])
+    assert len(label_index) == 0
+    assert label_index.contains_term("") == False
+
+
+def test_label_index_find_sequence():
+    label_index = _create_label_index()
+    assert label_index.find_sequence("musikpersonal verwalten") == [1, 3]
+    assert label_index.find_sequence("musikpersonal") == []
+
+
+def test_phrase_trie_longest_match():
+    phrase_trie = _create_label_index().phrase_trie
+    tokenized_text = ["musikpersonal", "verwalten", "musikpersonal"]
+    assert phrase_trie.longest_match(tokenized_text, 0) == 2
+    assert phrase_trie.longest_match(tokenized_text, 1) == 1
+    assert phrase_trie.longest_match(tokenized_text, 2) == 2
+
+
+def test_label_index_contains_token():
+    label_index = _create_label_index()
+    assert label_index.contains_token("verwalten") == True
+    assert label_index.contains_token("personal") == False
+    assert label_index.token_index["musikpersonal"] == [
+        "musikpersonal verwalten"
+    ]
+
+
+def test_substring_index():
+    substring_index = SubstringIndex(
+        ["musikpersonal verwalten", "strafvollzugsverfahren beaufsichtigen"]
+    )
+    assert substring_index.contains("") == True
+    assert substring_index.contains("k") == True
+    assert substring_index.contains("ik") == True
+    assert substring_index.contains("al verw") == True
+    assert substring_index.contains("vollzugsverfahren") == True
+    assert substring_index.contains("verwaltung") == False
+    assert substring_index.contains("n\nstraf") == False
+    assert SubstringIndex([]).contains("") == False
@@ -0,0 +1,92 @@
+from app.lexicon import (
+    Lexicon,
+    LexiconInvalid,
+    compile_lexicon,
+    compile_morphys_lexicon,
+    read_morphys,
+)
+from app.preprocessing_utils import MorphysLemmatizer
+import pytest
+
+
+def test_lexicon(tmp_path):
+    file_path = str(tmp_path / "morphys.lex")
+    size = compile_lexicon(
+        [
+            ("Verträge", "Vertrag"),
+            ("Kurse", "Kurs"),
+            ("Verträge", "Vertragx"),
+            ("leer", None),
+        ],
+        file_path,
+    )
+    assert size == 3
+
+    lexicon = Lexicon(file_path)
+    assert len(lexicon) == 3
+    assert lexicon["Verträge"] == "Vertrag"
+    assert lexicon["Kurse"] == "Kurs"
+    assert "leer" in lexicon
+    assert lexicon.get("leer") is None
+    assert "Unbekannt" not in lexicon
+    assert lexicon.get("Unbekannt", "Unbekannt") == "Unbekannt"
+    lexicon.close()
+
+
+def test_lexicon_invalid(tmp_path):
+    file_path = tmp_path / "morphys.csv"
+    file_path.write_text(",form,lemma\n0,Kurse,Kurs\n", encoding="utf-8")
+
+    with pytest.raises(LexiconInvalid):
+        Lexicon(str(file_path))
+
+
+def test_compile_morphys_lexicon_with_numeric_and_empty_cells(tmp_path):
+    morphys_file = tmp_path / "morphys.csv"
+    morphys_file.write_text(
+        ",form,lemma\n0,Kurse,Kurs\n1,1,1\n2,2.,\n3,,Leer\n4,NA,na\n",
+        encoding="utf-8",
+    )
+    file_path = str(tmp_path / "morphys.lex")
+
+    assert compile_morphys_lexicon(str(morphys_file), file_path) == 4
+
+    lexicon = Lexicon(file_path)
+    assert lexicon["Kurse"] == "Kurs"
+    assert lexicon["1"] == "1"
+    assert "2." in lexicon and lexicon["2."] is None
+    assert lexicon["NA"] == "na"
+    lexicon.close()
+
+
+def test_morphys_lemmatizer_same_for_csv_and_lexicon(tmp_path):
+    morphys_file = tmp_path / "morphys.csv"
+    morphys_file.write_text(
+        ",form,lemma\n0,Kurse,Kurs\n1,1,1\n2,2.,\n3,,Leer\n4,NA,na\n"
+        "5,Kurse,Kursus\n6,null,nichts\n",
+        encoding="utf-8",
+    )
+    file_path = str(tmp_path / "morphys.lex")
+    compile_morphys_lexicon(str(morphys_file), file_path)
+
+    tokens = ["Kurse", "1", "2.", "", "NA", "null", "NA-Kurse", "unbekannt"]
+    lexicon = Lexicon(file_path)
+    csv_lemmatizer = MorphysLemmatizer.from_dataframe(
+        read_morphys(str(morphys_file))
+    )
+    lexicon_lemmatizer = MorphysLemmatizer(lexicon)
+    assert [csv_lemmatizer.lemmatize(token) for token in tokens] == [
+        lexicon_lemmatizer.lemmatize(token) for token in tokens
+    ]
+    assert csv_lemmatizer.lemmatize("NA") == "na"
+    lexicon.close()
+
+
+def test_compile_lexicon_with_numbers(tmp_path):
+    file_path = str(tmp_path / "numbers.lex")
+
+    assert compile_lexicon([(1, 1.5), ("Kurse", "Kurs")], file_path) == 2
+
+    lexicon = Lexicon(file_path)
+    assert lexicon["1"] == "1.5"
+    lexicon.close()
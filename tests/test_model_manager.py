@@ -0,0 +1,33 @@
+from app.model_manager import SpacyModelManager, _get_resident_memory
+import sys
+import spacy
+
+
+def test_model_manager_loads_model_once(tmp_path):
+    spacy.blank("de").to_disk(tmp_path)
+    model_manager = SpacyModelManager()
+
+    model = model_manager.get(str(tmp_path))
+    assert model_manager.get(str(tmp_path)) is model
+
+    stats = model_manager.stats()
+    assert len(stats) == 1
+    assert stats[0]["path"] == str(tmp_path)
+    assert stats[0]["loadTime"] > 0
+
+
+def test_model_manager_without_memory_measurement(tmp_path, monkeypatch):
+    # e.g. on Windows, where neither "/proc" nor the "resource" Module exist
+    def open_missing(*args, **kwargs):
+        raise OSError("No such file or directory")
+
+    monkeypatch.setattr("builtins.open", open_missing)
+    monkeypatch.setitem(sys.modules, "resource", None)
+    assert _get_resident_memory() is None
+    monkeypatch.undo()
+
+    spacy.blank("de").to_disk(tmp_path)
+    monkeypatch.setattr("app.model_manager._get_resident_memory", lambda: None)
+    model_manager = SpacyModelManager()
+    model_manager.get(str(tmp_path))
+    assert model_manager.stats()[0]["memory"] is None
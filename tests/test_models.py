@@ -0,0 +1,26 @@
+from app.models import COMPETENCY_FIELDS, Competency, Course
+
+
+def test_competency_from_selected_properties():
+    competency = Competency.fromDatabaseProperties(
+        7, {"preferredLabel": "Musikpersonal verwalten"}
+    )
+
+    assert competency.toJSON(["preferredLabel"]) == {
+        "id": 7,
+        "preferredLabel": "Musikpersonal verwalten",
+    }
+    assert set(competency.toJSON()) == {"id", *COMPETENCY_FIELDS}
+    assert competency.toJSON()["conceptUri"] is None
+
+
+def test_course_from_selected_properties():
+    course = Course.fromDatabaseProperties(3, {"extractor": "paper"})
+
+    assert course.toJSON(["extractor"]) == {"id": 3, "extractor": "paper"}
+    assert course.toJSON([]) == {"id": 3}
+    assert course.toJSON() == {
+        "id": 3,
+        "description": None,
+        "extractor": "paper",
+    }
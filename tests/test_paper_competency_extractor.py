@@ -1,5 +1,6 @@
 from app.competency_extractor import (
     PaperCompetencyExtractor,
+    TrieCompetencyExtractor,
 )
 
 
@@ -33,3 +34,25 @@ def test_annotize2():
     competencies = competencyExtractor.extract_competencies(course_description)
 
     assert len(competencies[0]) == 3
+
+
+def test_trie_annotize_same_as_paper():
+    course_descriptions = [
+        "Musikpersonal verwalten ist ein anstrengender Skill. Er ist aber sehr hilfreich.",
+        """Befristung von Arbeitsverträgen mit und ohne Sachgrund.
+        Arbeitsrechtliche Sanktionen, Ermahnung, Abmahnung, Kündigung""",
+    ]
+
+    paper_competencies = PaperCompetencyExtractor().extract_competencies(
+        course_descriptions
+    )
+    trie_competencies = TrieCompetencyExtractor().extract_competencies(
+        course_descriptions
+    )
+
+    for paper_result, trie_result in zip(
+        paper_competencies, trie_competencies
+    ):
+        assert [competency.id for competency in paper_result] == [
+            competency.id for competency in trie_result
+        ]
@@ -0,0 +1,38 @@
+from app.preprocessing_cache import PreprocessingCache
+
+
+def test_preprocessing_cache():
+    cache = PreprocessingCache("1", max_size=2)
+    keys = [cache.key("Musikpersonal verwalten"), cache.key("Kurs")]
+
+    assert cache.get_many(keys) == [None, None]
+    cache.set_many([(keys[0], ["musikpersonal", "verwalten"])])
+    assert cache.get_many(keys) == [["musikpersonal", "verwalten"], None]
+    assert cache.stats() == {"hits": 1, "misses": 3, "size": 1}
+
+
+def test_preprocessing_cache_key():
+    cache = PreprocessingCache("1")
+    assert cache.key("Musikpersonal\nverwalten") == cache.key(
+        "Musikpersonalverwalten"
+    )
+    assert cache.key("Kurs") != PreprocessingCache("2").key("Kurs")
+
+
+def test_preprocessing_cache_evicts_least_recently_used():
+    cache = PreprocessingCache("1", max_size=2)
+    cache.set_many([("a", ["a"]), ("b", ["b"])])
+    cache.get_many(["a"])
+    cache.set_many([("c", ["c"])])
+    assert cache.get_many(["a", "b", "c"]) == [["a"], None, ["c"]]
+
+
+def test_preprocessing_cache_file(tmp_path):
+    file_path = str(tmp_path / "preprocessing_cache.sqlite")
+    cache = PreprocessingCache("1", file_path=file_path, max_file_size=2)
+    cache.set_many([("a", ["ä"]), ("b", ["b"]), ("c", ["c"])])
+    cache.close()
+
+    cache = PreprocessingCache("1", file_path=file_path)
+    assert cache.get_many(["a", "b", "c"]) == [None, ["b"], ["c"]]
+    cache.close()
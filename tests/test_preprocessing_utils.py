@@ -0,0 +1,63 @@
+from app.preprocessing_utils import (
+    MorphysLemmatizer,
+    PreprocessorGerman,
+    get_preprocessing_pool,
+)
+import pandas as pd
+
+texts = [
+    "Die Teilnehmer lernen, Arbeitsverträge zu verwalten.\nIm 2. Teil: Urlaubsansprüche & Kündigungen.",
+    "Musikpersonal verwalten",
+    "Ein Kurs über E-Learning-Plattformen (z.B. Moodle) - 3 Tage",
+    "",
+    "...",
+]
+
+
+def test_preprocess_texts_python_same_as_pandas():
+    preprocessor = PreprocessorGerman(use_cache=False)
+    result = preprocessor.preprocess_texts(texts)
+
+    preprocessor.engine = "pandas"
+    assert result == preprocessor.preprocess_texts(texts)
+
+
+def test_preprocess_texts_parallel_same_as_serial():
+    preprocessor = PreprocessorGerman(workers=2, chunk_size=2, use_cache=False)
+    result = preprocessor.preprocess_texts(texts * 3)
+    assert result == PreprocessorGerman(
+        workers=1, use_cache=False
+    ).preprocess_texts(texts * 3)
+
+
+def test_preprocess_texts():
+    preprocessor = PreprocessorGerman()
+    result = preprocessor.preprocess_texts(["Musikpersonal verwalten"])
+    assert result == [["musikpersonal", "verwalten"]]
+
+
+def test_morphys_lemmatizer():
+    lemmatizer = MorphysLemmatizer.from_dataframe(
+        pd.DataFrame(
+            {
+                "form": ["Verträge", "Verträge", "Kurse", "leer"],
+                "lemma": ["Vertrag", "Vertragx", "Kurs", None],
+            }
+        )
+    )
+    assert lemmatizer.lemmatize("Verträge") == "Vertrag"
+    assert lemmatizer.lemmatize("leer") == "leer"
+    assert lemmatizer.lemmatize("Unbekannt") == "Unbekannt"
+    assert lemmatizer.lemmatize("Kurse-Verträge") == "Kurs-Vertrag"
+    assert lemmatizer.lemmatize("E-Kurse") == "E-Kurs"
+
+
+def test_preprocess_texts_parallel_reuses_pool():
+    preprocessor = PreprocessorGerman(workers=2, chunk_size=2, use_cache=False)
+    preprocessor.preprocess_texts(texts)
+    pool = get_preprocessing_pool(2)
+
+    assert preprocessor.preprocess_texts(texts * 2) == PreprocessorGerman(
+        workers=2, chunk_size=2, use_cache=False
+    ).preprocess_texts(texts * 2)
+    assert get_preprocessing_pool(2) is pool
@@ -0,0 +1,58 @@
+from app.response_cache import CachedResponse, ResponseCache
+from werkzeug.datastructures import MultiDict
+import multiprocessing
+
+
+def test_key_is_normalized():
+    assert ResponseCache.key(
+        "/courses", MultiDict([("limit", "3"), ("fields", "description")])
+    ) == ResponseCache.key(
+        "/courses",
+        MultiDict([("fields", "description"), ("cursor", ""), ("limit", "3")]),
+    )
+    assert ResponseCache.key(
+        "/courses", MultiDict([("limit", "3")])
+    ) != ResponseCache.key("/competencies", MultiDict([("limit", "3")]))
+
+
+def test_invalidate_discards_responses():
+    cache = ResponseCache()
+    response = CachedResponse(b"[]", "application/json", {})
+
+    cache.set("courses", cache.version, response)
+    assert cache.get("courses", cache.version) is response
+
+    version = cache.version
+    cache.invalidate()
+    assert cache.get("courses", cache.version) is None
+
+    # responses created before a write are not cached anymore
+    cache.set("courses", version, response)
+    assert cache.get("courses", cache.version) is None
+
+
+def test_least_recently_used_responses_are_evicted():
+    cache = ResponseCache(max_size=2, max_bytes=10)
+
+    cache.set("a", 0, CachedResponse(b"1", "application/json", {}))
+    cache.set("b", 0, CachedResponse(b"2", "application/json", {}))
+    cache.get("a", 0)
+    cache.set("c", 0, CachedResponse(b"3", "application/json", {}))
+    assert cache.get("b", 0) is None
+    assert cache.get("a", 0) is not None
+
+    cache.set("d", 0, CachedResponse(b"1234567890", "application/json", {}))
+    assert len(cache) == 1
+    assert cache.get("d", 0) is not None
+
+
+def test_version_is_shared_with_forked_processes():
+    cache = ResponseCache()
+
+    process = multiprocessing.get_context("fork").Process(
+        target=cache.invalidate
+    )
+    process.start()
+    process.join()
+
+    assert cache.version == 1
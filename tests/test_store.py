@@ -1,4 +1,6 @@
-from app.store import Store
+from app.db import CompetencyInsertionFailed, GraphDatabaseConnection
+from app.store import Store, StoreAlreadyInitialized, StoreLocal
+import pytest
 
 
 def test_initialize():
@@ -30,3 +32,160 @@ def test_store_check_sequence_existing():
     store_instance = Store()
     result = store_instance.check_sequence(["musikpersonal", "verwalten"])
     assert len(result) > 0
+
+
+def test_store_check_sequences():
+    store_instance = Store()
+    result = store_instance.check_sequences(
+        [["musikpersonal", "verwalten"], ["nichtexistierendeswort"], []]
+    )
+    assert len(result) == 3
+    assert [competency.id for competency in result[0]] == [
+        competency.id
+        for competency in store_instance.check_sequence(
+            ["musikpersonal", "verwalten"]
+        )
+    ]
+    assert result[1] == []
+    assert result[2] == []
+
+
+def test_store_schema_uses_indexes():
+    store_instance = Store()
+    store_instance.db.create_schema()
+    result = store_instance.db.verify_schema()
+    assert all(result.values())
+
+
+def test_store_local_check_term():
+    store_instance = StoreLocal()
+    assert store_instance.check_term("musikpersonal") == True
+    assert store_instance.check_term("verwalt") == False
+    assert store_instance.check_term("nichtexistierendeswort") == False
+
+
+def test_store_local_check_term_substring():
+    store_instance = StoreLocal(substring_terms=True)
+    assert store_instance.check_term("verwalt") == True
+    assert store_instance.check_term("(") == False
+
+
+def test_store_local_check_sequence():
+    store_instance = StoreLocal()
+    result = store_instance.check_sequence(["musikpersonal", "verwalten"])
+    assert result == ["musikpersonal verwalten"]
+    assert store_instance.check_sequence([]) == []
+
+
+class FailingBatchDatabase(GraphDatabaseConnection):
+    """Keeps the competencies in memory like the MERGE of the Database and fails to insert one batch"""
+
+    def __init__(self, failing_batch: int):
+        self.failing_batch = failing_batch
+        self.batches = 0
+        self.competencies = {}
+        self.initialized = False
+
+    def create_schema(self):
+        pass
+
+    def _read_transaction(self, transaction_function, *args):
+        assert transaction_function == self._is_store_initialized
+        return self.initialized
+
+    def _write_transaction(self, transaction_function, *args):
+        if transaction_function == self._set_store_initialized:
+            self.initialized = True
+            return
+
+        self.batches += 1
+        if self.batches == self.failing_batch:
+            raise CompetencyInsertionFailed("batch failed")
+
+        for competency in args[0]:
+            self.competencies.setdefault(competency.conceptUri, competency)
+
+
+class SkillsPreprocessor:
+    def get_skills_from_file_as_json(self):
+        return {
+            f"uri{i}": {
+                "conceptType": "KnowledgeSkillCompetence",
+                "skillType": "skill/competence",
+                "reuseLevel": "sector-specific",
+                "preferredLabel": f"Kompetenz {i}",
+                "preferredLabelPreprocessed": ["kompetenz", str(i)],
+                "altLabels": None,
+                "hiddenLabels": None,
+                "status": "released",
+                "modifiedDate": None,
+                "scopeNote": None,
+                "definition": None,
+                "inScheme": None,
+                "description": None,
+            }
+            for i in range(5)
+        }
+
+
+def test_initialize_resumes_after_failed_batch(monkeypatch):
+    monkeypatch.setenv("IMPORT_BATCH_SIZE", "2")
+    db = FailingBatchDatabase(failing_batch=2)
+    store_instance = Store.__new__(Store)
+    store_instance.db = db
+    store_instance.preprocessor = SkillsPreprocessor()
+
+    with pytest.raises(CompetencyInsertionFailed):
+        store_instance.initialize()
+    assert len(db.competencies) == 2
+    assert not db.is_store_initialized()
+
+    # the second initialization inserts the missing competencies instead of raising StoreAlreadyInitialized
+    store_instance.initialize()
+    assert sorted(db.competencies) == [f"uri{i}" for i in range(5)]
+    assert db.is_store_initialized()
+
+    with pytest.raises(StoreAlreadyInitialized):
+        store_instance.initialize()
+
+
+class LabelsDatabase:
+    """Counts how often the Labels are loaded"""
+
+    def __init__(self):
+        self.labels = [("musikpersonal verwalten", 1)]
+        self.initialized = False
+        self.loaded = 0
+
+    def is_store_initialized(self):
+        return self.initialized
+
+    def retrieve_all_labels(self):
+        self.loaded += 1
+        return list(self.labels)
+
+
+def test_label_index_follows_data_version_until_initialized(monkeypatch):
+    version = [0]
+    monkeypatch.setattr(Store, "_label_index", None)
+    monkeypatch.setattr(Store, "_get_data_version", None)
+    Store.track_data_version(lambda: version[0])
+    db = LabelsDatabase()
+    store_instance = Store.__new__(Store)
+    store_instance.db = db
+
+    # another process is initializing the Store, the partial index is kept until the next write
+    assert store_instance.check_term("musikpersonal")
+    assert not store_instance.check_term("strafvollzug")
+    assert db.loaded == 1
+
+    db.labels.append(("strafvollzug beaufsichtigen", 2))
+    db.initialized = True
+    version[0] += 1
+    assert store_instance.check_term("strafvollzug")
+    assert db.loaded == 2
+
+    # the index of the initialized Store is kept regardless of other writes
+    version[0] += 1
+    assert store_instance.check_term("strafvollzug")
+    assert db.loaded == 2